@@ -4,83 +4,112 @@ import logging
 import re
 import psycopg2
 import os
+import sys
 import threading
 import queue
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.crawl_client import AdaptiveRateLimiter, CrawlClient
+from common.crawl_state import prepare
+
 
 load_dotenv()
 batch_size = 50
 max_threads = 10
 input_file = '../lc.txt'
+checkpoint_file = '../lc_crawl.sqlite'
+# Set crawl_retry_failed=1 to give URLs that used up their attempts another round.
+retry_failed = os.getenv("crawl_retry_failed") == "1"
+# Point this at a local stub to benchmark the crawl offline.
+graphql_url = os.getenv("leetcode_graphql_url", "https://leetcode.com/graphql")
+request_rate = float(os.getenv("leetcode_rate", "5"))
+max_request_rate = float(os.getenv("leetcode_max_rate", "20"))
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+http_client = CrawlClient(
+    cloudscraper.create_scraper,
+    limiter=AdaptiveRateLimiter(rate=request_rate, max_rate=max_request_rate),
+)
+
+def connect_db():
+    return psycopg2.connect(
+        user=os.getenv("user"),
+        password=os.getenv("password"),
+        host=os.getenv("host"),
+        port=os.getenv("port"),
+        dbname=os.getenv("dbname")
+    )
+
 def clean_text(text):
     text = text.encode('ascii', 'ignore').decode('ascii')
     return re.sub(r'\s+', ' ', text).strip()
 
-def extract_problem_details(slug_url):
-    try:
-        scraper = cloudscraper.create_scraper()
-        graphql_url = "https://leetcode.com/graphql"
-        slug = slug_url.rstrip('/').split("/")[-1]
-
-        payload = {
-            "operationName": "questionData",
-            "variables": {"titleSlug": slug},
-            "query": """
-            query questionData($titleSlug: String!) {
-              question(titleSlug: $titleSlug) {
-                questionTitle
-                content
-                topicTags {
-                  name
-                }
-              }
+def fetch_problem(slug_url, client=None):
+    client = client or http_client
+    slug = slug_url.rstrip('/').split("/")[-1]
+
+    payload = {
+        "operationName": "questionData",
+        "variables": {"titleSlug": slug},
+        "query": """
+        query questionData($titleSlug: String!) {
+          question(titleSlug: $titleSlug) {
+            questionTitle
+            content
+            topicTags {
+              name
             }
-            """
+          }
         }
-
-        headers = {
-            "Content-Type": "application/json",
-            "Referer": f"https://leetcode.com/problems/{slug}/",
-            "Origin": "https://leetcode.com",
-            "User-Agent": "Mozilla/5.0"
-        }
-
-        res = scraper.post(graphql_url, json=payload, headers=headers)
-        if res.status_code != 200:
-            logging.error(f"Failed to fetch {slug_url}: HTTP {res.status_code}")
-            return None
-
-        data = res.json()["data"]["question"]
-        if not data:
-            logging.error(f"No data found for {slug}")
-            return None
-
-        return {
-            'problem_name': data["questionTitle"],
-            'problem_link': slug_url,
-            'platform': 'LeetCode',
-            'topics': [tag["name"] for tag in data["topicTags"]],
-            'problem_statement': clean_text(BeautifulSoup(data["content"], "html.parser").get_text())
-        }
-
+        """
+    }
+
+    headers = {
+        "Content-Type": "application/json",
+        "Referer": f"https://leetcode.com/problems/{slug}/",
+        "Origin": "https://leetcode.com",
+        "User-Agent": "Mozilla/5.0"
+    }
+
+    res = client.post(graphql_url, json=payload, headers=headers)
+    if res.status_code != 200:
+        raise RuntimeError(f"HTTP {res.status_code}")
+
+    data = res.json()["data"]["question"]
+    if not data:
+        raise LookupError(f"No data found for {slug}")
+
+    return {
+        'problem_name': data["questionTitle"],
+        'problem_link': slug_url,
+        'platform': 'LeetCode',
+        'topics': [tag["name"] for tag in data["topicTags"]],
+        'problem_statement': clean_text(BeautifulSoup(data["content"], "html.parser").get_text())
+    }
+
+def extract_problem_details(slug_url, client=None):
+    try:
+        return fetch_problem(slug_url, client)
     except Exception as e:
         logging.error(f"Error processing {slug_url}: {e}")
         return None
 
-def insert_batch(batch):
+def fetch_into(problem_queue, slug_url, state=None):
     try:
-        conn = psycopg2.connect(
-            user=os.getenv("user"),
-            password=os.getenv("password"),
-            host=os.getenv("host"),
-            port=os.getenv("port"),
-            dbname=os.getenv("dbname")
-        )
+        problem_queue.put(fetch_problem(slug_url))
+    except Exception as e:
+        logging.error(f"Error processing {slug_url}: {e}")
+        if state is not None:
+            state.mark_failed(slug_url, str(e))
+
+def insert_batch(batch, state=None):
+    conn = None
+    cur = None
+    try:
+        conn = connect_db()
         cur = conn.cursor()
         insert_query = '''
             INSERT INTO problems (problem_name, problem_link, platform, problem_statement, topics)
@@ -94,41 +123,57 @@ def insert_batch(batch):
         cur.executemany(insert_query, values)
         conn.commit()
         logging.info(f"Inserted batch of size {len(batch)}")
+        if state is not None:
+            state.mark_done([p['problem_link'] for p in batch])
     except Exception as e:
         logging.error(f"DB insert error: {e}")
+        if state is not None:
+            for p in batch:
+                state.mark_failed(p['problem_link'], f"insert failed: {e}")
     finally:
-        cur.close()
-        conn.close()
+        if cur is not None:
+            cur.close()
+        if conn is not None:
+            conn.close()
 
-def batch_inserter_worker(problem_queue):
+def batch_inserter_worker(problem_queue, state=None):
     buffer = []
     while True:
         problem = problem_queue.get()
         if problem is None:
             if buffer:
-                insert_batch(buffer)
+                insert_batch(buffer, state)
             break
 
         buffer.append(problem)
         if len(buffer) >= batch_size:
-            insert_batch(buffer)
+            insert_batch(buffer, state)
             buffer = []
 
 if __name__ == "__main__":
-    problem_queue = queue.Queue()
-    inserter_thread = threading.Thread(target=batch_inserter_worker, args=(problem_queue,))
-    inserter_thread.start()
-
     urls = []
     with open(input_file, 'r') as file:
         urls = [line.strip() for line in file if line.strip()]
 
+    conn = connect_db()
+    try:
+        state = prepare(checkpoint_file, urls, conn, retry_failed=retry_failed)
+    finally:
+        conn.close()
+
+    problem_queue = queue.Queue()
+    inserter_thread = threading.Thread(target=batch_inserter_worker, args=(problem_queue, state))
+    inserter_thread.start()
+
+    # Only URLs that never landed and are past their retry backoff; the
+    # rest wait for a later run.
     with ThreadPoolExecutor(max_workers=max_threads) as executor:
-        for url in urls:
-            executor.submit(
-                lambda u: problem_queue.put(p) if (p := extract_problem_details(u)) else None,
-                url
-            )
+        for url in state.due():
+            executor.submit(fetch_into, problem_queue, url, state)
 
     problem_queue.put(None)
     inserter_thread.join()
+    state.log("LeetCode crawl")
+    state.close()
+    http_client.metrics.log("LeetCode GraphQL")
+    http_client.close()
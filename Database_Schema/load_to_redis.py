@@ -1,13 +1,14 @@
+import os
+import sys
 import json
-import redis
+from dotenv import load_dotenv
 
-r = redis.Redis(
-    host='redis-14042.crce179.ap-south-1-1.ec2.redns.redis-cloud.com',
-    port=14042,
-    decode_responses=True,
-    username="default",
-    password="tXnxcUbI5bazp5R8mXtl9qFumLOLBMHA",
-)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.vocab_snapshot import build_snapshot
+from common.redis_config import create_redis_client
+
+load_dotenv()
+r = create_redis_client(decode_responses=True)
 
 with open("vocab.json", "r") as f:
     vocab_data = json.load(f)
@@ -18,4 +19,7 @@ with open("idf.json", "r") as f:
     idf_data = json.load(f)
 r.set("idf_json", json.dumps(idf_data))
 
+snapshot = build_snapshot((w, idx, idf_data.get(w, 0.0)) for w, idx in vocab_data.items())
+r.set("vocab_snapshot", snapshot)
+
 print("✅ Uploaded vocab and idf to Redis!")
@@ -0,0 +1,39 @@
+import psycopg2
+import os
+from dotenv import load_dotenv
+
+# Brings an existing problems table up to date without dropping anything:
+# adds search_text and updated_at, then the trigger that keeps updated_at
+# current, which tf-idf.py --incremental uses as its change watermark.
+# Idempotent; schema.py runs the same SQL on a fresh table.
+PROBLEMS_TRIGGER_SQL = '''
+ALTER TABLE problems ADD COLUMN IF NOT EXISTS search_text TEXT;
+ALTER TABLE problems ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+CREATE OR REPLACE FUNCTION touch_problem_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS problems_touch_updated_at ON problems;
+CREATE TRIGGER problems_touch_updated_at BEFORE UPDATE ON problems
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION touch_problem_updated_at();
+CREATE INDEX IF NOT EXISTS problems_updated_at_idx ON problems (updated_at);
+'''
+
+if __name__ == "__main__":
+    load_dotenv()
+    conn = psycopg2.connect(
+        user=os.getenv("user"),
+        password=os.getenv("password"),
+        host=os.getenv("host"),
+        port=os.getenv("port"),
+        dbname=os.getenv("dbname")
+    )
+    try:
+        with conn.cursor() as cur:
+            cur.execute(PROBLEMS_TRIGGER_SQL)
+        conn.commit()
+        print("problems migrated: search_text, updated_at and the updated_at trigger are in place")
+    finally:
+        conn.close()
@@ -3,72 +3,96 @@ from bs4 import BeautifulSoup
 import logging
 import re
 import psycopg2
+from psycopg2.extras import execute_values
 import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.crawl_client import AdaptiveRateLimiter, CrawlClient
+from common.crawl_state import prepare
+
 load_dotenv()
 batch_size = 100
+max_threads = int(os.getenv("codeforces_concurrency", "8"))
+request_rate = float(os.getenv("codeforces_rate", "5"))
+max_request_rate = float(os.getenv("codeforces_max_rate", "20"))
+# Fetchers block once this many parsed problems are waiting for the inserter.
+queue_size = 4 * batch_size
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 input_file = '../codeforces.txt'
+checkpoint_file = '../codeforces_crawl.sqlite'
+# Set crawl_retry_failed=1 to give URLs that used up their attempts another round.
+retry_failed = os.getenv("crawl_retry_failed") == "1"
+
+http_client = CrawlClient(
+    cloudscraper.create_scraper,
+    limiter=AdaptiveRateLimiter(rate=request_rate, max_rate=max_request_rate),
+)
 
 
+def connect_db():
+    return psycopg2.connect(
+        user=os.getenv("user"),
+        password=os.getenv("password"),
+        host=os.getenv("host"),
+        port=os.getenv("port"),
+        dbname=os.getenv("dbname")
+    )
+
 def clean_text(text):
     text = text.encode('ascii', 'ignore').decode('ascii')
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def extract_problem_details(url):
+def parse_problem(html, url):
+    soup = BeautifulSoup(html, 'html.parser')
+
+    problem_name = soup.find('div', class_='title').text.strip()
+    problem_statement = soup.find('div', class_='problem-statement').text.strip()
+    problem_statement = clean_text(problem_statement)  # Clean the problem statement
+
+    tags = soup.find_all('span', class_='tag-box')
+    topics = [tag.text.strip() for tag in tags]
+
+    return {
+        'problem_name': problem_name,
+        'problem_link': url,
+        'platform': 'Codeforces',
+        'topics': topics,
+        'problem_statement': problem_statement
+    }
+
+def fetch_problem(url, client=None):
+    response = (client or http_client).get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    return parse_problem(response.text, url)
+
+def extract_problem_details(url, client=None):
     try:
-        scraper = cloudscraper.create_scraper()
-        response = scraper.get(url)
-
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            problem_name = soup.find('div', class_='title').text.strip()
-            problem_statement = soup.find('div', class_='problem-statement').text.strip()
-            problem_statement = clean_text(problem_statement)  # Clean the problem statement
-
-            tags = soup.find_all('span', class_='tag-box')
-            topics = [tag.text.strip() for tag in tags]
-
-            return {
-                'problem_name': problem_name,
-                'problem_link': url,
-                'platform': 'Codeforces',
-                'topics': topics,
-                'problem_statement': problem_statement
-            }
-        else:
-            logging.error(f"Failed to fetch URL {url}: HTTP {response.status_code}")
-            return None
+        return fetch_problem(url, client)
     except Exception as e:
         logging.error(f"Error processing URL {url}: {e}")
         return None
 
 
-def insert_problems_in_batches(data, batch_size=10):
-    try:
-        conn = psycopg2.connect(
-            user=os.getenv("user"),
-            password=os.getenv("password"),
-            host=os.getenv("host"),
-            port=os.getenv("port"),
-            dbname=os.getenv("dbname")
-        )
-        cur = conn.cursor()
-
-        insert_query = '''
-        INSERT INTO problems (problem_name, problem_link, platform, problem_statement, topics)
-        VALUES (%s, %s, %s, %s, %s)
-        ON CONFLICT (problem_link) DO NOTHING;
-        '''
-
-        for i in range(0, len(data), batch_size):
-            batch = data[i:i + batch_size]
-            values = [
+def insert_problems(conn, batch):
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            '''
+            INSERT INTO problems (problem_name, problem_link, platform, problem_statement, topics)
+            VALUES %s
+            ON CONFLICT (problem_link) DO NOTHING;
+            ''',
+            [
                 (
                     problem['problem_name'],
                     problem['problem_link'],
@@ -77,32 +101,136 @@ def insert_problems_in_batches(data, batch_size=10):
                     problem['topics']
                 )
                 for problem in batch
-            ]
-            cur.executemany(insert_query, values)
-            conn.commit()
-            logging.info(f"Inserted batch {i // batch_size + 1}")
+            ],
+        )
+    conn.commit()
+
+
+def put_until_stopped(problem_queue, item, stopped):
+    # A bounded put that gives up once the inserter is gone, so no fetcher
+    # (or the final sentinel) waits forever on a queue nobody drains.
+    while not stopped.is_set():
+        try:
+            problem_queue.put(item, timeout=1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def batch_inserter_worker(problem_queue, connect=connect_db, write_batch=insert_problems, stats=None, state=None,
+                          stopped=None):
+    # The single consumer: one connection reused across batches, one
+    # INSERT ... VALUES per batch. A failed batch drops the connection and
+    # the next batch opens a fresh one.
+    conn = None
+    buffer = []
+    inserted = 0
+
+    def close():
+        nonlocal conn
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception as e:
+                logging.error(f"Error closing connection: {e}")
+            conn = None
+
+    def flush():
+        nonlocal conn, inserted
+        try:
+            if conn is None:
+                conn = connect()
+            write_batch(conn, buffer)
+            inserted += len(buffer)
+            logging.info(f"Inserted batch of {len(buffer)} ({inserted} total)")
+        except Exception as e:
+            logging.error(f"Error inserting batch: {e}")
+            # Closing discards the open transaction; a broken connection
+            # cannot be rolled back anyway.
+            close()
+            if state is not None:
+                for problem in buffer:
+                    state.mark_failed(problem['problem_link'], f"insert failed: {e}")
+            return
+        if state is not None:
+            state.mark_done([problem['problem_link'] for problem in buffer])
+
+    try:
+        while True:
+            problem = problem_queue.get()
+            if problem is None:
+                if buffer:
+                    flush()
+                break
+            buffer.append(problem)
+            if len(buffer) >= batch_size:
+                flush()
+                buffer = []
+    finally:
+        if stopped is not None:
+            stopped.set()
+        close()
+        if stats is not None:
+            stats['inserted'] = inserted
+
+
+def fetch_into(problem_queue, url, client=None, state=None, stopped=None):
+    if stopped is not None and stopped.is_set():
+        return False
+    try:
+        details = fetch_problem(url, client)
     except Exception as e:
-        logging.error(f"Error inserting batch: {e}")
+        logging.error(f"Error processing URL {url}: {e}")
+        if state is not None:
+            state.mark_failed(url, str(e))
+        return False
+    if stopped is None:
+        problem_queue.put(details)
+        return True
+    if not put_until_stopped(problem_queue, details, stopped):
+        # Still pending in the checkpoint, so the next run fetches it again.
+        logging.error(f"Inserter stopped; dropping {url}")
+        return False
+    return True
+
+
+def crawl(urls, concurrency=max_threads, client=None, connect=connect_db, write_batch=insert_problems, state=None):
+    problem_queue = queue.Queue(maxsize=queue_size)
+    stats = {}
+    stopped = threading.Event()
+    inserter_thread = threading.Thread(target=batch_inserter_worker,
+                                       args=(problem_queue, connect, write_batch, stats, state, stopped))
+    inserter_thread.start()
+
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            fetched = sum(executor.map(lambda u: fetch_into(problem_queue, u, client, state, stopped), urls))
     finally:
-        cur.close()
-        conn.close()
+        put_until_stopped(problem_queue, None, stopped)
+        inserter_thread.join()
 
+    elapsed = time.monotonic() - started
+    logging.info(f"Fetched {fetched} of {len(urls)} problems in {elapsed:.1f}s "
+                 f"({fetched / max(elapsed, 1e-9):.1f}/s, {concurrency} workers), inserted {stats.get('inserted', 0)}")
+    return fetched, stats.get('inserted', 0)
 
-if __name__ == "__main__":
-    problems = []
 
+if __name__ == "__main__":
     with open(input_file, 'r') as file:
-        for line in file:
-            url = line.strip()
-            if url:
-                logging.info(f"Processing: {url}")
-                details = extract_problem_details(url)
-                if details:
-                    problems.append(details)
-
-                if len(problems) == batch_size:
-                    insert_problems_in_batches(problems, batch_size= batch_size)
-                    problems = []
-
-    if problems:
-        insert_problems_in_batches(problems, batch_size=100)
\ No newline at end of file
+        urls = [line.strip() for line in file if line.strip()]
+
+    conn = connect_db()
+    try:
+        state = prepare(checkpoint_file, urls, conn, retry_failed=retry_failed)
+    finally:
+        conn.close()
+
+    # Only URLs that never landed and are past their retry backoff; the
+    # rest wait for a later run.
+    crawl(state.due(), state=state)
+    state.log("Codeforces crawl")
+    state.close()
+    http_client.metrics.log("Codeforces")
+    http_client.close()
@@ -1,21 +1,77 @@
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import VectorParams, Distance
+from qdrant_client.http.models import (
+    VectorParams, Distance, SparseVectorParams, PayloadSchemaType, CreateAlias, CreateAliasOperation,
+)
 from dotenv import load_dotenv
 import os
+import sys
 load_dotenv()
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.vocab_snapshot import vocab_dimension
+from common.collection_profiles import DEFAULT_PROFILE, get_profile, quantization_config
+
 qdrant_client = QdrantClient(
     url= os.getenv("qdrant_url"),
     api_key= os.getenv("qdrant_apikey"),
 )
 
-VOCAB_SIZE = 25602
+VOCAB_SIZE = vocab_dimension(
+    os.getenv("vocab_snapshot_path"),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocab.json"),
+)
+print(f"Dense vector dimension: {VOCAB_SIZE}")
+# float32 | int8 | int8_on_disk; query.py reads the same variable.
+PROFILE = os.getenv("qdrant_profile", DEFAULT_PROFILE)
+
+
+def create_aliased_collection(name, size, **kwargs):
+    # Dense collections are reached through an alias so tf-idf.py can build a
+    # resized replacement and swap it in without taking the name offline.
+    target = f"{name}_{size}"
+    qdrant_client.create_collection(collection_name=target, **kwargs)
+    qdrant_client.update_collection_aliases(change_aliases_operations=[
+        CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=name)),
+    ])
+
+
 if not qdrant_client.collection_exists(collection_name="problems_v2"):
-    qdrant_client.create_collection(
-        collection_name="problems_v2",
-        vectors_config=VectorParams(size=VOCAB_SIZE, distance=Distance.COSINE),
+    create_aliased_collection(
+        "problems_v2", VOCAB_SIZE,
+        vectors_config=VectorParams(
+            size=VOCAB_SIZE, distance=Distance.COSINE, on_disk=get_profile(PROFILE)["on_disk"],
+        ),
+        quantization_config=quantization_config(PROFILE),
     )
+    print(f"Created problems_v2 with the {PROFILE} profile")
 else:
     print("Collection already exists")
 
+if not qdrant_client.collection_exists(collection_name="problems_sparse"):
+    qdrant_client.create_collection(
+        collection_name="problems_sparse",
+        vectors_config={},
+        sparse_vectors_config={"tfidf": SparseVectorParams()},
+    )
+else:
+    print("Sparse collection already exists")
+
+LSA_DIMENSION = int(os.getenv("lsa_dimension", "256"))
+if not qdrant_client.collection_exists(collection_name="problems_lsa"):
+    create_aliased_collection(
+        "problems_lsa", LSA_DIMENSION,
+        vectors_config=VectorParams(size=LSA_DIMENSION, distance=Distance.COSINE),
+    )
+else:
+    print("LSA collection already exists")
+
+# Keyword indexes keep platform/topic filtered HNSW searches and facet counts fast.
+for collection_name in ("problems_v2", "problems_sparse", "problems_lsa"):
+    for field_name in ("platform", "topics"):
+        qdrant_client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
+
 print(qdrant_client.get_collections())
@@ -1,7 +1,12 @@
 import psycopg2
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.fingerprints import SCHEMA as FINGERPRINT_SCHEMA
+from migrate_problems import PROBLEMS_TRIGGER_SQL
+
 load_dotenv()
 
 conn = psycopg2.connect(
@@ -15,6 +20,8 @@ conn = psycopg2.connect(
 cur = conn.cursor()
 
 cur.execute("DROP TABLE IF EXISTS problems;")
+# Recreated ids would otherwise match fingerprints of the old rows.
+cur.execute("DROP TABLE IF EXISTS problem_fingerprints;")
 
 create_table_query = '''
 CREATE TABLE IF NOT EXISTS problems (
@@ -23,11 +30,15 @@ CREATE TABLE IF NOT EXISTS problems (
     problem_link TEXT UNIQUE NOT NULL,
     platform TEXT NOT NULL,
     problem_statement TEXT,
-    topics TEXT[]  
+    topics TEXT[],
+    search_text TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 '''
 
 cur.execute(create_table_query)
+cur.execute(PROBLEMS_TRIGGER_SQL)
+cur.execute(FINGERPRINT_SCHEMA)
 conn.commit()
 
 print("Table created successfully!")
@@ -1,37 +1,42 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import logging
 import cloudscraper
+import os
+import sys
 import time
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.crawl_client import AdaptiveRateLimiter, CrawlClient
 
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+site_url = "https://codeforces.com"
 base_url = "https://codeforces.com/problemset/page/"
 
+http_client = CrawlClient(cloudscraper.create_scraper, limiter=AdaptiveRateLimiter(rate=2.0, max_rate=5.0))
+
+
+def parse_problem_links(html, page_url=site_url):
+    # The same `table.problems a` selector the browser used, applied to the
+    # HTML directly; relative hrefs are resolved against the page.
+    soup = BeautifulSoup(html, 'html.parser')
+    problem_links = set()
+    for link in soup.select("table.problems a"):
+        href = link.get('href')
+        if href and "/problemset/problem/" in href:
+            problem_links.add(urljoin(page_url, href))
+    return problem_links
+
 
 def get_links_from_page(url):
     try:
-        scraper = cloudscraper.create_scraper()
-        response = scraper.get(url)
+        response = http_client.get(url)
 
         if response.status_code == 200:
-            driver.get("data:text/html;charset=utf-8," + response.text)
-            
-            links = driver.find_elements(By.CSS_SELECTOR, "table.problems a")  
-            
-            problem_links = set()
-            for link in links:
-                href = link.get_attribute('href')
-                if href and "/problemset/problem/" in href:
-                    problem_links.add(href)
-
-            return problem_links
+            return parse_problem_links(response.text, url)
         else:
             logging.error(f"Failed to fetch URL {url}: HTTP {response.status_code}")
             return set()
@@ -39,19 +44,40 @@ def get_links_from_page(url):
         logging.error(f"Error loading URL {url}: {e}")
         return set()
 
-logging.info("Starting to scrape Codeforces problems...")
-all_links = set()
-for page in range(1, 6):  
-    page_url = f"{base_url}{page}"
-    logging.info(f"Scraping page: {page_url}")
-    all_links.update(get_links_from_page(page_url))
 
-output_file = 'codeforces1.txt'
-with open(output_file, 'w') as f:
-    for link in sorted(all_links):
-        f.write(link + '\n')
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collect Codeforces problem links from the problemset pages")
+    parser.add_argument("--pages", type=int, default=5, help="problemset pages to read (default: 5)")
+    parser.add_argument("--workers", type=int, default=4, help="pages fetched at once (default: 4)")
+    parser.add_argument("--output", default='codeforces1.txt')
+    parser.add_argument("--fixture", nargs="+", metavar="HTML",
+                        help="parse these saved problemset pages instead of fetching")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.monotonic()
+    all_links = set()
+    if args.fixture:
+        for path in args.fixture:
+            with open(path, encoding='utf-8') as f:
+                all_links.update(parse_problem_links(f.read()))
+    else:
+        logging.info("Starting to scrape Codeforces problems...")
+        page_urls = [f"{base_url}{page}" for page in range(1, args.pages + 1)]
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            for links in executor.map(get_links_from_page, page_urls):
+                all_links.update(links)
+        http_client.metrics.log("Codeforces problemset")
+        http_client.close()
+
+    with open(args.output, 'w') as f:
+        for link in sorted(all_links):
+            f.write(link + '\n')
 
-logging.info(f"Total unique links found: {len(all_links)}")
+    logging.info(f"Total unique links found: {len(all_links)} in {time.monotonic() - started:.2f}s")
 
 
-driver.quit()
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,139 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
 import logging
+import cloudscraper
+import os
+import sys
 import time
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.crawl_client import AdaptiveRateLimiter, CrawlClient
 
-page_URL = "https://leetcode.com/problemset/"
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def get_a_tags(url):
+problem_url = "https://leetcode.com/problems/{slug}/"
+graphql_url = os.getenv("leetcode_graphql_url", "https://leetcode.com/graphql")
+page_size = 100
+page_attempts = 3
+
+# The paginated list the problemset page itself loads as you scroll.
+QUESTION_LIST_QUERY = """
+query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {
+  problemsetQuestionList: questionList(categorySlug: $categorySlug, limit: $limit, skip: $skip, filters: $filters) {
+    total: totalNum
+    questions: data {
+      titleSlug
+      paidOnly: isPaidOnly
+    }
+  }
+}
+"""
+
+http_client = CrawlClient(cloudscraper.create_scraper, limiter=AdaptiveRateLimiter(rate=2.0, max_rate=10.0))
+
+
+def parse_question_list(document, include_paid=False):
+    question_list = document["data"]["problemsetQuestionList"]
+    links = [
+        problem_url.format(slug=question["titleSlug"])
+        for question in question_list["questions"]
+        if include_paid or not question.get("paidOnly")
+    ]
+    return question_list["total"], links
+
+
+def fetch_page(skip, limit=page_size):
+    payload = {
+        "operationName": "problemsetQuestionList",
+        "variables": {"categorySlug": "", "skip": skip, "limit": limit, "filters": {}},
+        "query": QUESTION_LIST_QUERY,
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "Referer": "https://leetcode.com/problemset/",
+        "Origin": "https://leetcode.com",
+        "User-Agent": "Mozilla/5.0"
+    }
+    res = http_client.post(graphql_url, json=payload, headers=headers)
+    if res.status_code != 200:
+        raise RuntimeError(f"HTTP {res.status_code} for problems {skip}-{skip + limit}")
+    return res.json()
+
+
+def fetch_question_list(skip, include_paid=False, attempts=page_attempts):
+    # The client already retries throttling; this covers everything else a
+    # single page can fail with (5xx, a truncated or malformed body).
+    for attempt in range(1, attempts + 1):
+        try:
+            return parse_question_list(fetch_page(skip), include_paid)
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            logging.warning(f"Problems {skip}-{skip + page_size} failed (attempt {attempt}/{attempts}): {e}")
+            time.sleep(2 ** attempt)
+
+
+def fetch_page_links(skip, include_paid=False):
     try:
-        driver.get(url)
-        
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-
-            for _ in range(10):
-                time.sleep(1)  
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height != last_height:
-                    break  
-            else:
-                break  
-
-            last_height = new_height
-
-        container = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "w-full.pb-\\[80px\\]"))
-        )
-
-        links = container.find_elements(By.TAG_NAME, "a")
-
-        unique_links = set()
-        for link in links:
-            try:
-                href = link.get_attribute("href")
-                if href and "/problems/" in href:
-                    unique_links.add(href)
-            except Exception as e:
-                logging.warning(f"Error processing link: {e}")
-
-        return list(unique_links)
+        return fetch_question_list(skip, include_paid)[1]
     except Exception as e:
-        logging.error(f"Error loading URL {url}: {e}")
-        return []
-
-logging.info("Starting to scrape LeetCode problems...")
-problem_links = get_a_tags(page_URL)
-
-
-
-output_file = '../lc.txt'
-with open(output_file, 'w') as f:
-    for link in problem_links:
-        f.write(link + '\n')
-
-logging.info(f"Total unique links found: {len(problem_links)}")
-
-# Close the browser
-driver.quit()
+        logging.error(f"Skipping problems {skip}-{skip + page_size}: {e}")
+        return None
+
+
+def get_problem_links(workers, include_paid=False):
+    # The first page reports the total; the rest are fetched side by side. A
+    # page that keeps failing is skipped so the others are still written.
+    total, links = fetch_question_list(0, include_paid)
+    skipped = []
+    skips = range(page_size, total, page_size)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for skip, page_links in zip(skips, executor.map(lambda skip: fetch_page_links(skip, include_paid), skips)):
+            if page_links is None:
+                skipped.append(skip)
+            else:
+                links.extend(page_links)
+    return total, links, skipped
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collect LeetCode problem links from the paginated problem list")
+    parser.add_argument("--workers", type=int, default=4, help="pages fetched at once (default: 4)")
+    parser.add_argument("--include-paid", action="store_true", help="also list premium-only problems")
+    parser.add_argument("--output", default='../lc.txt')
+    parser.add_argument("--fixture", nargs="+", metavar="JSON",
+                        help="parse these saved problemsetQuestionList responses instead of fetching")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.monotonic()
+    if args.fixture:
+        total = 0
+        problem_links = []
+        for path in args.fixture:
+            with open(path, encoding='utf-8') as f:
+                total, links = parse_question_list(json.load(f), args.include_paid)
+            problem_links.extend(links)
+    else:
+        logging.info("Starting to scrape LeetCode problems...")
+        total, problem_links, skipped = get_problem_links(args.workers, args.include_paid)
+        http_client.metrics.log("LeetCode problem list")
+        http_client.close()
+        if skipped:
+            logging.error(f"{len(skipped)} pages were skipped (offsets {', '.join(map(str, skipped))}); "
+                          "rerun to fill them in")
+
+    problem_links = sorted(set(problem_links))
+    with open(args.output, 'w') as f:
+        for link in problem_links:
+            f.write(link + '\n')
+
+    logging.info(f"Total unique links found: {len(problem_links)} of {total} problems "
+                 f"in {time.monotonic() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+const { spawn } = require("child_process");
+const path = require("path");
+const readline = require("readline");
+
+const SCRIPT_PATH = path.resolve(__dirname, "../../query/query.py");
+const POOL_SIZE = parseInt(process.env.QUERY_WORKERS || "2", 10);
+const RESPAWN_DELAY = 1000;
+
+class QueryWorker {
+  constructor(id) {
+    this.id = id;
+    this.pending = new Map();
+    this.nextRequestId = 1;
+    this.start();
+  }
+
+  start() {
+    this.python = spawn("python3", [SCRIPT_PATH, "--serve"]);
+    this.alive = true;
+
+    const lines = readline.createInterface({ input: this.python.stdout });
+    lines.on("line", (line) => this.onLine(line));
+
+    this.python.stderr.on("data", (data) => {
+      process.stderr.write(`[query-worker ${this.id}] ${data}`);
+    });
+
+    this.python.on("exit", (code, signal) => {
+      this.alive = false;
+      this.failAll(new Error(`Query worker exited (${signal || code})`));
+      setTimeout(() => this.start(), RESPAWN_DELAY);
+    });
+
+    this.python.stdin.on("error", (err) => {
+      console.error(`Query worker ${this.id} stdin error:`, err.message);
+    });
+
+    this.python.on("error", (err) => {
+      console.error(`Query worker ${this.id} failed to start:`, err.message);
+    });
+  }
+
+  onLine(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (err) {
+      console.error(`Query worker ${this.id} sent invalid output:`, line);
+      return;
+    }
+
+    const request = this.pending.get(message.id);
+    if (!request) return;
+
+    this.pending.delete(message.id);
+    clearTimeout(request.timeoutId);
+    if (message.error) {
+      request.reject(new Error(`Script failed: ${message.error}`));
+    } else {
+      request.resolve(message.results);
+    }
+  }
+
+  failAll(err) {
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timeoutId);
+      request.reject(err);
+    }
+    this.pending.clear();
+  }
+
+  send(payload, timeout) {
+    return new Promise((resolve, reject) => {
+      if (!this.alive) {
+        return reject(new Error("Query worker is restarting"));
+      }
+
+      const id = this.nextRequestId++;
+      const timeoutId = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Query timed out after ${timeout / 1000} seconds`));
+        // A worker that stops answering is replaced; the exit handler fails
+        // whatever else was queued on it.
+        this.python.kill();
+      }, timeout);
+
+      this.pending.set(id, { resolve, reject, timeoutId });
+      this.python.stdin.write(JSON.stringify({ ...payload, id }) + "\n");
+    });
+  }
+}
+
+class QueryWorkerPool {
+  constructor(size) {
+    this.workers = Array.from({ length: Math.max(size, 1) }, (_, i) => new QueryWorker(i));
+  }
+
+  pick() {
+    const alive = this.workers.filter((w) => w.alive);
+    const candidates = alive.length ? alive : this.workers;
+    return candidates.reduce((best, w) => (w.pending.size < best.pending.size ? w : best));
+  }
+
+  run(payload, timeout) {
+    return this.pick().send(payload, timeout);
+  }
+}
+
+let pool = null;
+
+function getQueryPool() {
+  if (!pool) {
+    pool = new QueryWorkerPool(POOL_SIZE);
+  }
+  return pool;
+}
+
+module.exports = { getQueryPool, QueryWorkerPool };
@@ -0,0 +1,128 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Database_Schema"))
+from common.crawl_client import CrawlClient, RequestMetrics
+
+# Trimmed to the parts of a Codeforces problem page the parser reads.
+PROBLEM_PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title></head><body>
+<div id="sidebar"><div class="roundbox sidebox">
+  <span class="tag-box" title="Difficulty">*1600</span>
+  <span class="tag-box">dp</span>
+  <span class="tag-box">greedy</span>
+  <span class="tag-box">binary search</span>
+</div></div>
+<div class="problemindexholder"><div class="ttypography"><div class="problem-statement">
+  <div class="header"><div class="title">{title}</div>
+    <div class="time-limit"><div class="property-title">time limit per test</div>2 seconds</div>
+  </div>
+  <div>{body}</div>
+  <div class="input-specification"><div class="section-title">Input</div>
+    <p>The first line contains an integer n (1 &le; n &le; 2&middot;10<sup>5</sup>).</p></div>
+  <div class="output-specification"><div class="section-title">Output</div><p>Print one integer.</p></div>
+</div></div></div>
+</body></html>
+"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        # Stands in for the TCP + TLS handshake a fresh session pays for.
+        time.sleep(self.server.handshake)
+
+    def do_GET(self):
+        if self.server.page is not None:
+            data = self.server.page
+        else:
+            title = "A. " + self.path.rstrip("/").replace("/", " ").title()
+            body = "<p>You are given an array a of n integers. Find the maximum sum of a segment.</p>" * 30
+            data = PROBLEM_PAGE.format(title=title, body=body).encode()
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fixture_server(latency, handshake, page_path=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.handshake = handshake
+    server.connections = 0
+    server.lock = threading.Lock()
+    server.page = None
+    if page_path:
+        with open(page_path, "rb") as f:
+            server.page = f.read()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def discard(conn, batch):
+    time.sleep(0.002)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Codeforces processor throughput against a local HTML fixture server")
+    parser.add_argument("--problems", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--latency", type=float, default=0.05, help="fixture seconds per page")
+    parser.add_argument("--handshake", type=float, default=0.05, help="fixture seconds per new connection")
+    parser.add_argument("--page", metavar="PATH", help="serve this saved problem page instead of the built-in one")
+    args = parser.parse_args()
+
+    import problem_processor as processor
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    server = start_fixture_server(args.latency, args.handshake, args.page)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/problemset/problem/{1000 + i // 6}/{'ABCDEF'[i % 6]}" for i in range(args.problems)]
+    print(f"{len(urls)} pages, latency {args.latency * 1e3:.0f} ms, handshake {args.handshake * 1e3:.0f} ms")
+
+    def report(label, fetched, elapsed, metrics, connections):
+        s = metrics.summary()
+        print(f"{label:<16} {fetched:5d}/{len(urls)} in {elapsed:6.2f}s ({fetched / elapsed:6.1f} pages/s)  "
+              f"p50 {s['p50'] * 1e3:5.0f} ms  p95 {s['p95'] * 1e3:5.0f} ms  connections {connections:4d}")
+
+    # The old loop: one page at a time, a fresh scraper for each.
+    metrics = RequestMetrics()
+    connections = server.connections
+    started = time.perf_counter()
+    fetched = 0
+    for url in urls:
+        client = CrawlClient(processor.cloudscraper.create_scraper, metrics=metrics, max_retries=0)
+        fetched += processor.extract_problem_details(url, client) is not None
+    report("sequential", fetched, time.perf_counter() - started, metrics, server.connections - connections)
+
+    for concurrency in args.concurrency:
+        client = CrawlClient(processor.cloudscraper.create_scraper)
+        connections = server.connections
+        started = time.perf_counter()
+        fetched, _ = processor.crawl(urls, concurrency=concurrency, client=client,
+                                     connect=lambda: None, write_batch=discard)
+        report(f"pool x{concurrency}", fetched, time.perf_counter() - started, client.metrics,
+               server.connections - connections)
+        client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
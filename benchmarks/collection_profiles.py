@@ -0,0 +1,139 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "query"))
+from common.collection_profiles import PROFILES, get_profile, quantization_config, search_params
+
+load_dotenv()
+
+
+def synthetic_vectors(count, dim, terms, seed):
+    # TF-IDF-like rows: a few dozen non-zero weights, L2-normalized.
+    rng = np.random.default_rng(seed)
+    vectors = np.zeros((count, dim), dtype=np.float32)
+    popular = rng.choice(dim, size=min(dim, 2000), replace=False)
+    for row in range(count):
+        columns = np.concatenate([rng.choice(popular, size=terms // 2), rng.integers(0, dim, size=terms - terms // 2)])
+        vectors[row, columns] = rng.random(terms, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def local_index_vectors(path, limit):
+    from local_index import LocalIndex
+    matrix = LocalIndex.load(path).by_term.tocsr()[:limit]
+    return matrix.toarray().astype(np.float32)
+
+
+def wait_until_indexed(client, collection_name, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.get_collection(collection_name)
+        if str(info.status).lower().endswith("green"):
+            return
+        time.sleep(0.5)
+    print(f"  {collection_name} still optimizing after {timeout}s; timings may include unindexed segments")
+
+
+def measured_memory(client, collection_name):
+    # RAM and disk as the server reports them per segment in its telemetry,
+    # summed over the collection's local shards. The embedded :memory: client
+    # has no telemetry.
+    try:
+        service_api = client.http.service_api
+    except NotImplementedError:
+        return None
+    telemetry = service_api.telemetry(anonymize=False, details_level=3).result
+    ram = disk = 0
+    for collection in telemetry.collections.collections or []:
+        if getattr(collection, "id", None) != collection_name:
+            continue
+        for shard in collection.shards or []:
+            for segment in (shard.local.segments if shard.local else None) or []:
+                ram += segment.info.ram_usage_bytes or 0
+                disk += segment.info.disk_usage_bytes or 0
+    return ram, disk
+
+
+def percentile(samples, q):
+    return float(np.percentile(np.asarray(samples) * 1e3, q))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory, latency and recall of the problems_v2 storage profiles")
+    parser.add_argument("--url", default=os.getenv("qdrant_url"), help="Qdrant URL (':memory:' for a dry run)")
+    parser.add_argument("--api-key", default=os.getenv("qdrant_apikey"))
+    parser.add_argument("--local-index", metavar="PATH", help="use rows of tf-idf.py's local index (default: synthetic)")
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=25602)
+    parser.add_argument("--terms", type=int, default=60, help="non-zeros per synthetic vector")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--index-timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=9)
+    args = parser.parse_args()
+
+    if args.local_index:
+        vectors = local_index_vectors(args.local_index, args.points)
+    else:
+        vectors = synthetic_vectors(args.points, args.dim, args.terms, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    # Queries are perturbed documents so every query has close neighbours.
+    queries = vectors[rng.choice(len(vectors), size=args.queries, replace=False)]
+    queries = queries + rng.normal(scale=0.01, size=queries.shape).astype(np.float32) * (queries > 0)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    k = min(args.k, len(vectors))
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+
+    if args.url == ":memory:":
+        client = QdrantClient(location=":memory:")
+    else:
+        client = QdrantClient(url=args.url, api_key=args.api_key, timeout=300.0)
+    print(f"{len(vectors)} points x {vectors.shape[1]} dims, {len(queries)} queries, recall@{k} vs exact cosine")
+    for name in args.profiles:
+        profile = get_profile(name)
+        collection_name = f"bench_profile_{name}"
+        if client.collection_exists(collection_name):
+            client.delete_collection(collection_name)
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE, on_disk=profile["on_disk"]),
+            quantization_config=quantization_config(name),
+        )
+        try:
+            for start in range(0, len(vectors), 64):
+                client.upsert(collection_name=collection_name, points=[
+                    PointStruct(id=row, vector=vectors[row].tolist())
+                    for row in range(start, min(start + 64, len(vectors)))
+                ])
+            wait_until_indexed(client, collection_name, args.index_timeout)
+
+            params = search_params(name)
+            latencies = []
+            hits = 0
+            for query, truth in zip(queries, exact):
+                started = time.perf_counter()
+                response = client.query_points(collection_name=collection_name, query=query.tolist(),
+                                               search_params=params, limit=k, with_payload=False)
+                latencies.append(time.perf_counter() - started)
+                hits += len(set(truth.tolist()) & {point.id for point in response.points})
+            memory = measured_memory(client, collection_name)
+            memory = "RAM      n/a  disk      n/a" if memory is None else \
+                f"RAM {memory[0] / 2 ** 20:8.1f} MiB  disk {memory[1] / 2 ** 20:8.1f} MiB"
+            print(f"{name:<14} {memory}  p50 {percentile(latencies, 50):7.2f} ms  "
+                  f"p99 {percentile(latencies, 99):7.2f} ms  recall@{k} {hits / (len(queries) * k):.3f}")
+        finally:
+            client.delete_collection(collection_name)
+
+
+if __name__ == "__main__":
+    main()
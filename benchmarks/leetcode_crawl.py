@@ -0,0 +1,146 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from common.crawl_client import AdaptiveRateLimiter, CrawlClient, RequestMetrics
+
+
+class ServerQuota:
+    # The stub's own rate limit: requests over it get a 429, like the real API.
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        if not self.rate:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+class StubGraphQLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        # Stands in for the TCP + TLS handshake a fresh session pays for.
+        time.sleep(self.server.handshake)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        slug = body["variables"]["titleSlug"]
+        if not self.server.quota.take():
+            self.reply(429, {"errors": [{"message": "rate limited"}]})
+            return
+        time.sleep(self.server.latency)
+        self.reply(200, {"data": {"question": {
+            "questionTitle": slug.replace("-", " ").title(),
+            "content": f"<p>Given an array <code>nums</code>, solve {slug}.</p>" * 20,
+            "topicTags": [{"name": "Array"}, {"name": "Dynamic Programming"}],
+        }}})
+
+    def reply(self, status, document):
+        data = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(port, latency, handshake, quota):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubGraphQLHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.handshake = handshake
+    server.quota = ServerQuota(quota)
+    server.connections = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def crawl(processor, urls, threads, client_for_request):
+    fetched = []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for problem in executor.map(lambda u: processor.extract_problem_details(u, client_for_request()), urls):
+            if problem:
+                fetched.append(problem)
+    return fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl throughput of the LeetCode processor against a stub GraphQL server")
+    parser.add_argument("--problems", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.03, help="stub seconds per response")
+    parser.add_argument("--handshake", type=float, default=0.05, help="stub seconds per new connection")
+    parser.add_argument("--quota", type=float, default=60.0, help="stub requests/s before it answers 429 (0: none)")
+    parser.add_argument("--rate", type=float, default=10.0, help="limiter's starting requests/s")
+    parser.add_argument("--max-rate", type=float, default=200.0)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--serve", action="store_true",
+                        help="only run the stub, e.g. for leetcode_problem_processor.py with leetcode_graphql_url set")
+    args = parser.parse_args()
+
+    server = start_stub(args.port, args.latency, args.handshake, args.quota)
+    url = f"http://127.0.0.1:{server.server_address[1]}/graphql"
+    if args.serve:
+        print(f"Stub GraphQL server on {url}")
+        threading.Event().wait()
+
+    os.environ["leetcode_graphql_url"] = url
+    sys.path.insert(0, os.path.join(ROOT, "Database_Schema"))
+    import leetcode_problem_processor as processor
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    urls = [f"https://leetcode.com/problems/stub-problem-{i}/" for i in range(args.problems)]
+    print(f"{len(urls)} problems, {args.threads} threads, stub latency {args.latency * 1e3:.0f} ms, "
+          f"handshake {args.handshake * 1e3:.0f} ms, quota {args.quota or 'none'}/s")
+
+    # The old behaviour: a fresh scraper (and connection) per problem, no limiter.
+    baseline_metrics = RequestMetrics()
+    runs = [("per-request session", baseline_metrics,
+             lambda: CrawlClient(processor.cloudscraper.create_scraper, metrics=baseline_metrics, max_retries=0))]
+    pooled = CrawlClient(processor.cloudscraper.create_scraper,
+                         limiter=AdaptiveRateLimiter(rate=args.rate, max_rate=args.max_rate))
+    runs.append(("pooled + adaptive", pooled.metrics, lambda: pooled))
+
+    for label, metrics, client_for_request in runs:
+        connections = server.connections
+        metrics.started = time.monotonic()
+        started = time.perf_counter()
+        fetched = crawl(processor, urls, args.threads, client_for_request)
+        elapsed = time.perf_counter() - started
+        s = metrics.summary()
+        print(f"{label:<20} {len(fetched):5d}/{len(urls)} fetched in {elapsed:6.2f}s "
+              f"({len(fetched) / elapsed:6.1f} problems/s)  p50 {s['p50'] * 1e3:5.0f} ms  "
+              f"p95 {s['p95'] * 1e3:5.0f} ms  connections {server.connections - connections:4d}  "
+              f"statuses {s['statuses']}")
+    pooled.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "query"))
+from common.lsa import fit_projection, project_matrix, normalize_rows
+from local_index import LocalIndex
+
+VOCAB_PATH = os.path.join(ROOT, "Database_Schema", "vocab.json")
+
+
+def synthetic_matrix(docs, length, topics, seed):
+    # Each doc mixes two topics (each a Zipf distribution over its own words)
+    # with background noise, so there is latent structure for LSA to find.
+    with open(VOCAB_PATH) as f:
+        words = len(json.load(f))
+    rng = np.random.default_rng(seed)
+    topic_words = [rng.choice(words, size=300, replace=False) for _ in range(topics)]
+    zipf = 1.0 / np.arange(1, 301)
+    zipf /= zipf.sum()
+    rows = []
+    for _ in range(docs):
+        a, b = rng.choice(topics, size=2, replace=False)
+        terms = np.concatenate([
+            rng.choice(topic_words[a], size=length // 2, p=zipf),
+            rng.choice(topic_words[b], size=length // 3, p=zipf),
+            rng.integers(0, words, size=length - length // 2 - length // 3),
+        ])
+        rows.append(np.bincount(terms, minlength=words))
+    counts = sparse.csr_matrix(np.vstack(rows).astype(np.float32))
+    df = np.bincount(counts.indices, minlength=words)
+    idf = np.where(df > 0, 1 + np.log(docs / np.maximum(df, 1)), 0).astype(np.float32)
+    tfidf = sparse.csr_matrix(counts.multiply(1 / counts.sum(axis=1)).multiply(idf))
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1))).ravel()
+    return sparse.csr_matrix(sparse.diags(1 / np.maximum(norms, 1e-12)) @ tfidf, dtype=np.float32)
+
+
+def query_vectors(matrix, count, terms, seed):
+    # Short queries: the few highest-weight terms of sampled documents.
+    rng = random.Random(seed)
+    queries = []
+    for row in rng.sample(range(matrix.shape[0]), count):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        top = np.argsort(-matrix.data[start:end])[:terms]
+        indices = matrix.indices[start:end][top]
+        values = matrix.data[start:end][top]
+        order = np.argsort(indices)
+        queries.append((indices[order].tolist(), (values[order] / np.linalg.norm(values)).tolist()))
+    return queries
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of LSA embeddings against exact TF-IDF search")
+    parser.add_argument("--local-index", metavar="PATH", help="npz written by tf-idf.py --local-index (default: synthetic)")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--length", type=int, default=100)
+    parser.add_argument("--topics", type=int, default=80)
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-terms", type=int, default=5)
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.local_index:
+        matrix = LocalIndex.load(args.local_index).by_term.tocsr()
+    else:
+        matrix = synthetic_matrix(args.docs, args.length, args.topics, args.seed)
+    queries = query_vectors(matrix, args.queries, args.query_terms, args.seed)
+    index = LocalIndex(matrix, np.arange(matrix.shape[0]), [{}] * matrix.shape[0])
+    k = min(args.k, matrix.shape[0])
+    truth = [{row for row, _ in index.search(indices, values, k)} for indices, values in queries]
+
+    query_matrix = sparse.csr_matrix(
+        (np.concatenate([np.asarray(v, dtype=np.float32) for _, v in queries]),
+         np.concatenate([np.asarray(i, dtype=np.int32) for i, _ in queries]),
+         np.cumsum([0] + [len(i) for i, _ in queries])),
+        shape=(len(queries), matrix.shape[1]),
+    )
+    dense_docs = matrix.toarray()
+    dense_queries = query_matrix.toarray()
+    _, full_time = timed(lambda: dense_docs @ dense_queries.T, 3)
+    print(f"{matrix.shape[0]} docs, {matrix.shape[1]} terms, {matrix.nnz} non-zeros; recall@{k} vs exact TF-IDF")
+    print(f"tf-idf   dim {matrix.shape[1]:6d}  exact dense scoring {full_time / len(queries) * 1e3:7.3f} ms/query")
+
+    for dim in args.dims:
+        (projection, _), fit_time = timed(lambda: fit_projection(matrix, dim), 1)
+        docs = project_matrix(matrix, projection)
+        projected = normalize_rows(np.asarray(query_matrix @ projection, dtype=np.float32))
+        scores, lsa_time = timed(lambda: docs @ projected.T, 3)
+        recall = np.mean([
+            len(truth[q] & set(np.argpartition(-scores[:, q], k - 1)[:k].tolist())) / len(truth[q])
+            for q in range(len(queries)) if truth[q]
+        ])
+        print(f"lsa      dim {dim:6d}  exact dense scoring {lsa_time / len(queries) * 1e3:7.3f} ms/query  "
+              f"recall@{k} {recall:.3f}  fit {fit_time:.1f}s  projection {projection.nbytes / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
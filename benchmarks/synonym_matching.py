@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.synonyms import DSA_SYNONYMS, FLATTENED_SYNONYMS, matched_canonicals
+
+VOCAB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Database_Schema", "vocab.json")
+
+QUERIES = [
+    "dp", "binary search", "graph", "bfs", "breadth first search", "shortest path in a grid",
+    "union find with rollback", "count subsets with given sum", "segment tree lazy propagation",
+    "minimum spanning tree kruskal", "longest increasing subsequence", "two pointers on sorted array",
+]
+
+
+def scan_expand(query):
+    original_words = query.lower().split()
+    expanded_terms = set(original_words)
+
+    for word in original_words:
+        if word in DSA_SYNONYMS:
+            expanded_terms.update(DSA_SYNONYMS[word])
+
+    query_lower = query.lower()
+    for canonical, synonyms in DSA_SYNONYMS.items():
+        if canonical in query_lower:
+            expanded_terms.update(synonyms)
+            expanded_terms.add(canonical)
+
+    for synonym, canonical in FLATTENED_SYNONYMS.items():
+        if synonym in query_lower:
+            expanded_terms.add(canonical)
+            if canonical in DSA_SYNONYMS:
+                expanded_terms.update(DSA_SYNONYMS[canonical])
+    return expanded_terms
+
+
+def matcher_expand(query):
+    expanded_terms = set(query.lower().split())
+    keys, via_synonyms = matched_canonicals(query.lower())
+    for canonical in keys | via_synonyms:
+        expanded_terms.add(canonical)
+        expanded_terms.update(DSA_SYNONYMS[canonical])
+    return expanded_terms
+
+
+def scan_augment(text):
+    text_lower = text.lower()
+    return {canonical for synonym, canonical in FLATTENED_SYNONYMS.items()
+            if synonym in text_lower and canonical not in text_lower}
+
+
+def matcher_augment(text):
+    keys, via_synonyms = matched_canonicals(text.lower())
+    return via_synonyms - keys
+
+
+def synthetic_statements(count, length, seed):
+    with open(VOCAB_PATH) as f:
+        words = list(json.load(f))
+    phrases = list(FLATTENED_SYNONYMS) + list(DSA_SYNONYMS)
+    rng = random.Random(seed)
+    statements = []
+    for _ in range(count):
+        tokens = [rng.choice(words) for _ in range(length)]
+        for _ in range(3):
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(phrases))
+        statements.append(" ".join(tokens))
+    return statements
+
+
+def timed(fn, inputs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            fn(item)
+    return (time.perf_counter() - start) / (repeat * len(inputs))
+
+
+def compare(label, inputs, scan_fn, matcher_fn, repeat):
+    mismatches = sum(1 for item in inputs if scan_fn(item) != matcher_fn(item))
+    scan = timed(scan_fn, inputs, repeat)
+    matcher = timed(matcher_fn, inputs, repeat)
+    print(f"{label:<22} scan {scan * 1e6:9.1f} us  matcher {matcher * 1e6:9.1f} us  "
+          f"speedup {scan / matcher:5.1f}x  mismatches {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare linear synonym scans with the compiled matcher")
+    parser.add_argument("--statements", type=int, default=500)
+    parser.add_argument("--length", type=int, default=300, help="words per synthetic statement")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    statements = synthetic_statements(args.statements, args.length, args.seed)
+    compare("query expansion", QUERIES, scan_expand, matcher_expand, args.repeat * 200)
+    compare("statement augment", statements, scan_augment, matcher_augment, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
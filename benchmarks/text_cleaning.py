@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from multiprocessing import Pool
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "processor"))
+from cleaning import BUZZWORDS, TextCleaner, load_stopwords
+
+VOCAB_PATH = os.path.join(ROOT, "Database_Schema", "vocab.json")
+
+# Used only when the stopword cache is missing and nltk cannot download it;
+# the timings depend on the set size far less than on the per-token work.
+FALLBACK_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but by
+can did do does doing down during each few for from further had has have having he her here hers him his how i if in
+into is it its itself just me more most my no nor not now of off on once only or other our out over own same she should
+so some such than that the their them then there these they this those through to too under until up very was we were
+what when where which while who whom why will with you your
+""".split())
+
+
+def regex_clean(text, stop_words, buzzwords):
+    # The cleaner's previous implementation, kept as the baseline.
+    text = text.encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r'<[^>]+>', ' ', text)
+    text = re.sub(r'[^a-zA-Z\s]', ' ', text)
+    text = text.lower()
+    tokens = text.split()
+    tokens = [t for t in tokens if t not in stop_words and t not in buzzwords]
+    return ' '.join(tokens)
+
+
+def synthetic_statements(count, length, seed, stop_words):
+    with open(VOCAB_PATH) as f:
+        words = list(json.load(f))
+    noise = ["<p>", "</p>", "<code>", "</code>", "$n$", "10^5", "a[i]", "(1", "≤", "—", "café", "x_i,", "2⋅10^5", "&lt;"]
+    filler = sorted(stop_words) + sorted(BUZZWORDS)
+    rng = random.Random(seed)
+    statements = []
+    for _ in range(count):
+        tokens = []
+        for _ in range(length):
+            roll = rng.random()
+            if roll < 0.5:
+                word = rng.choice(words)
+                tokens.append(word.capitalize() if rng.random() < 0.1 else word)
+            elif roll < 0.85:
+                tokens.append(rng.choice(filler))
+            else:
+                tokens.append(rng.choice(noise))
+        statements.append(" ".join(tokens))
+    return statements
+
+
+worker_cleaner = None
+
+
+def init_worker(stop_words):
+    global worker_cleaner
+    worker_cleaner = TextCleaner(stop_words)
+
+
+def clean_chunk(chunk):
+    return [worker_cleaner.clean(text) for text in chunk]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the statement cleaner on a synthetic corpus")
+    parser.add_argument("--statements", type=int, default=20000)
+    parser.add_argument("--length", type=int, default=250, help="tokens per synthetic statement")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    try:
+        stop_words = load_stopwords()
+    except Exception as e:
+        print(f"Stopword list unavailable ({e}); using a {len(FALLBACK_STOPWORDS)}-word stand-in")
+        stop_words = FALLBACK_STOPWORDS
+    statements = synthetic_statements(args.statements, args.length, args.seed, stop_words)
+    megabytes = sum(len(s) for s in statements) / 2 ** 20
+    print(f"{len(statements)} statements, {megabytes:.1f} MiB, {os.cpu_count()} CPUs")
+
+    stop_set = set(stop_words)
+    buzz_set = set(BUZZWORDS)
+    start = time.perf_counter()
+    expected = [regex_clean(text, stop_set, buzz_set) for text in statements]
+    baseline = time.perf_counter() - start
+    print(f"{'regex baseline':<18} {len(statements) / baseline:9.0f} docs/s  {megabytes / baseline:6.1f} MiB/s")
+
+    cleaner = TextCleaner(stop_words)
+    start = time.perf_counter()
+    cleaned = [cleaner.clean(text) for text in statements]
+    single = time.perf_counter() - start
+    mismatches = sum(a != b for a, b in zip(expected, cleaned))
+    print(f"{'engine x1':<18} {len(statements) / single:9.0f} docs/s  {megabytes / single:6.1f} MiB/s  "
+          f"speedup {baseline / single:4.1f}x  mismatches {mismatches}")
+
+    chunks = [statements[i:i + args.chunk] for i in range(0, len(statements), args.chunk)]
+    for workers in args.workers:
+        with Pool(workers, initializer=init_worker, initargs=(stop_words,)) as pool:
+            start = time.perf_counter()
+            cleaned = [text for chunk in pool.map(clean_chunk, chunks) for text in chunk]
+            elapsed = time.perf_counter() - start
+        mismatches = sum(a != b for a, b in zip(expected, cleaned))
+        print(f"{f'engine x{workers}':<18} {len(statements) / elapsed:9.0f} docs/s  {megabytes / elapsed:6.1f} MiB/s  "
+              f"speedup {baseline / elapsed:4.1f}x  mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
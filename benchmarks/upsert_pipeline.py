@@ -0,0 +1,73 @@
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.upsert_pipeline import UpsertPipeline
+
+
+class LatencyClient:
+    # Stands in for QdrantClient: each upsert costs one network round trip and
+    # a small share of them fail, like a busy cluster shedding load.
+    def __init__(self, latency, failure_rate, seed):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.received = set()
+
+    def upsert(self, collection_name, points, wait=True):
+        time.sleep(self.latency)
+        if self.rng.random() < self.failure_rate:
+            raise ConnectionError("simulated timeout")
+        self.received.update(points)
+
+
+def sequential(client, batches, base_delay):
+    for batch in batches:
+        for attempt in range(6):
+            try:
+                client.upsert(collection_name="bench", points=batch)
+                break
+            except Exception:
+                time.sleep(base_delay * (2 ** attempt))
+
+
+def pipelined(client, batches, in_flight, base_delay):
+    with UpsertPipeline(client, in_flight=in_flight, base_delay=base_delay, report_every=0) as pipeline:
+        for batch in batches:
+            pipeline.submit("bench", batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare one-at-a-time upserts with the pipelined upserter")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per upsert round trip")
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--base-delay", type=float, default=0.05)
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    points = list(range(args.points))
+    batches = [points[i:i + args.batch_size] for i in range(0, len(points), args.batch_size)]
+
+    runs = [("sequential", lambda client: sequential(client, batches, args.base_delay))]
+    for in_flight in args.in_flight:
+        runs.append((f"pipeline x{in_flight}",
+                     lambda client, n=in_flight: pipelined(client, batches, n, args.base_delay)))
+
+    for label, run in runs:
+        client = LatencyClient(args.latency, args.failure_rate, seed=1)
+        start = time.perf_counter()
+        run(client)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<14} {elapsed:7.2f} s  {args.points / elapsed:9.0f} points/s  "
+              f"delivered {len(client.received)}/{args.points}")
+
+
+if __name__ == "__main__":
+    main()
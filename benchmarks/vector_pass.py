@@ -0,0 +1,107 @@
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import os
+import pickle
+import random
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from qdrant_client.http.models import PointsList
+
+VOCAB_PATH = os.path.join(ROOT, "Database_Schema", "vocab.json")
+
+
+def load_tfidf_module():
+    spec = importlib.util.spec_from_file_location("tfidf", os.path.join(ROOT, "tf-idf", "tf-idf.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_corpus(count, length, seed):
+    with open(VOCAB_PATH) as f:
+        words = list(json.load(f))
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    return [(pid, " ".join(rng.choices(words, weights=weights, k=length))) for pid in range(1, count + 1)], words
+
+
+def rate(count, fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def main():
+    # Each vector pass worker vectorizes, builds points and encodes its own
+    # upsert requests; the parent only unpickles the sparse vectors the workers
+    # send back and adds them to the local index. This times each stage on one
+    # core: the worker stages divide by the worker count, the parent stages do
+    # not.
+    parser = argparse.ArgumentParser(description="Time each stage of the TF-IDF vector pass")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--length", type=int, default=200, help="words per synthetic statement")
+    parser.add_argument("--vector-mode", choices=["dense", "sparse"], default="dense")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    tfidf = load_tfidf_module()
+    docs, words = synthetic_corpus(args.docs, args.length, args.seed)
+    doc_freq = Counter()
+    for _, text in docs:
+        doc_freq.update(set(text.split()))
+    word2idx = {w: i for i, w in enumerate(words)}
+    idf = {w: 1 + math.log(len(docs) / doc_freq.get(w, 1)) for w in words}
+    vocabulary = tfidf.VocabSnapshot(tfidf.build_snapshot((w, i, idf[w]) for w, i in word2idx.items()),
+                                     term_index=True)
+    processor = tfidf.TfIdfProcessor(None, vector_mode=args.vector_mode)
+    vectors = tfidf.vectorize_batch(docs, vocabulary)
+    payloads = {pid: {"id": pid, "problem_name": f"Problem {pid}", "platform": "Codeforces"} for pid, _ in docs}
+
+    class Collect:
+        def __init__(self):
+            self.batches = []
+
+        def submit(self, collection_name, points):
+            self.batches.append(points)
+
+    def build_points():
+        collected = Collect()
+        processor.upsert_vectors(collected, vectors, payloads, len(word2idx))
+        return collected.batches
+
+    batches = build_points()
+    packed = pickle.dumps(vectors)
+
+    def add_to_local_index():
+        local_index = tfidf.LocalIndexBuilder(len(word2idx))
+        for pid, indices, values in pickle.loads(packed):
+            local_index.add(pid, indices, values, payloads[pid])
+
+    stages = [
+        ("vectorize", rate(len(docs), lambda: tfidf.vectorize_batch(docs, vocabulary), args.repeat), False),
+        ("build points", rate(len(docs), build_points, args.repeat), False),
+        ("encode upsert requests", rate(len(docs), lambda: [PointsList(points=batch).model_dump_json()
+                                                            for batch in batches], args.repeat), False),
+        ("parent: local index", rate(len(docs), add_to_local_index, args.repeat), True),
+    ]
+    for label, docs_per_second, _ in stages:
+        print(f"{label:<24} {docs_per_second:10.0f} docs/s")
+    worker = 1 / sum(1 / docs_per_second for _, docs_per_second, in_parent in stages if not in_parent)
+    parent = 1 / sum(1 / docs_per_second for _, docs_per_second, in_parent in stages if in_parent)
+    print(f"per worker ({args.vector_mode}, dim {len(word2idx)}): {worker:.0f} docs/s; "
+          f"parent ceiling {parent:.0f} docs/s, reached at ~{math.ceil(parent / worker)} workers")
+
+if __name__ == "__main__":
+    main()
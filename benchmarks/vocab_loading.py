@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.vocab_snapshot import VocabSnapshot, DictVocabulary, build_snapshot
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Database_Schema")
+
+
+def load_json_vocabulary(idf_blob, vocab_blob):
+    idf = json.loads(idf_blob)
+    vocab = json.loads(vocab_blob)
+    return DictVocabulary({w: i for i, w in enumerate(vocab)}, idf)
+
+
+def measure(label, loader):
+    tracemalloc.start()
+    start = time.perf_counter()
+    vocabulary = loader()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<18} load {elapsed * 1e3:8.2f} ms  peak python heap {peak / 2 ** 20:7.2f} MiB")
+    return vocabulary
+
+
+def time_lookups(label, vocabulary, words, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for w in words:
+            vocabulary.lookup(w)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} lookup {elapsed / (repeat * len(words)) * 1e6:6.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON vocab/IDF loading with the binary snapshot")
+    parser.add_argument("--idf", default=os.path.join(SCHEMA_DIR, "idf.json"))
+    parser.add_argument("--vocab", default=os.path.join(SCHEMA_DIR, "vocab.json"))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.idf) as f:
+        idf_blob = f.read()
+    with open(args.vocab) as f:
+        vocab_blob = f.read()
+    idf = json.loads(idf_blob)
+    vocab = json.loads(vocab_blob)
+    snapshot_bytes = build_snapshot((w, i, idf.get(w, 0.0)) for i, w in enumerate(vocab))
+    print(f"JSON blobs {(len(idf_blob) + len(vocab_blob)) / 1024:.0f} KiB, snapshot {len(snapshot_bytes) / 1024:.0f} KiB")
+
+    with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+        f.write(snapshot_bytes)
+        snapshot_path = f.name
+    try:
+        json_vocab = measure("json + dict", lambda: load_json_vocabulary(idf_blob, vocab_blob))
+        bytes_vocab = measure("snapshot bytes", lambda: VocabSnapshot(snapshot_bytes))
+        mmap_vocab = measure("snapshot mmap", lambda: VocabSnapshot.load(snapshot_path))
+
+        for w in vocab:
+            expected = json_vocab.lookup(w)
+            for candidate in (bytes_vocab, mmap_vocab):
+                idx, value = candidate.lookup(w)
+                if idx != expected[0] or abs(value - expected[1]) > 1e-5 * max(1.0, expected[1]):
+                    raise SystemExit(f"Snapshot mismatch for {w!r}")
+        print(f"Verified {len(vocab)} terms")
+
+        words = random.Random(3).sample(list(vocab), 30) + ["notaword", "zzzz"]
+        time_lookups("json + dict", json_vocab, words, args.repeat)
+        time_lookups("snapshot cold", VocabSnapshot.load(snapshot_path), words, 1)
+        time_lookups("snapshot warm", mmap_vocab, words, args.repeat)
+    finally:
+        os.unlink(snapshot_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "query"))
+from local_index import LocalIndex
+
+VOCAB_PATH = os.path.join(ROOT, "Database_Schema", "vocab.json")
+
+
+def load_tfidf_module():
+    spec = importlib.util.spec_from_file_location("tfidf", os.path.join(ROOT, "tf-idf", "tf-idf.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_corpus(count, length, seed):
+    # Zipf-distributed words from the real vocabulary plus a sprinkle of
+    # one-off tokens, which is roughly what typos do to the real corpus.
+    with open(VOCAB_PATH) as f:
+        words = list(json.load(f))
+    rng = random.Random(seed)
+    rng.shuffle(words)
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    docs = []
+    for pid in range(count):
+        tokens = rng.choices(words, weights=weights, k=length)
+        tokens += [f"{rng.choice(words)}{rng.randrange(10 ** 6)}" for _ in range(length // 50)]
+        docs.append((pid, " ".join(tokens)))
+    return docs
+
+
+def build_matrix(tfidf, docs, vocab_list, doc_freq, total_docs):
+    word2idx = {w: i for i, w in enumerate(vocab_list)}
+    idf = {w: 1 + math.log(total_docs / doc_freq[w]) for w in vocab_list}
+    vocabulary = tfidf.DictVocabulary(word2idx, idf)
+    indptr = [0]
+    indices = []
+    data = []
+    for _, row_indices, row_values in tfidf.vectorize_batch(docs, vocabulary):
+        indices.extend(row_indices)
+        data.extend(row_values)
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix((np.asarray(data, dtype=np.float32), indices, indptr),
+                               shape=(len(docs), len(vocab_list)))
+    return matrix, vocabulary
+
+
+def time_queries(matrix, vocabulary, queries, tfidf, repeat):
+    index = LocalIndex(matrix, np.arange(matrix.shape[0]), [{}] * matrix.shape[0])
+    dense = matrix.toarray()
+    vectors = [vec[1:] for vec in tfidf.vectorize_batch(queries, vocabulary)]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for indices, values in vectors:
+            index.search(indices, values, 100)
+    sparse_time = (time.perf_counter() - start) / (repeat * len(vectors))
+
+    # Brute-force dense scoring: what an exact dense search costs per query.
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for indices, values in vectors:
+            query = np.zeros(dense.shape[1], dtype=np.float32)
+            query[indices] = values
+            scores = dense @ query
+            np.argpartition(-scores, 100)[:100]
+    dense_time = (time.perf_counter() - start) / (repeat * len(vectors))
+    return sparse_time, dense_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure what vocabulary pruning saves in index size and latency")
+    parser.add_argument("--docs", type=int, default=3000)
+    parser.add_argument("--length", type=int, default=120, help="words per synthetic statement")
+    parser.add_argument("--min-df", type=int, default=2)
+    parser.add_argument("--max-df", type=float, default=0.5)
+    parser.add_argument("--max-vocab", type=int, default=8000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    tfidf = load_tfidf_module()
+    docs = synthetic_corpus(args.docs, args.length, args.seed)
+    queries = [(i, " ".join(text.split()[:6])) for i, (_, text) in enumerate(random.Random(5).sample(docs, args.queries))]
+    doc_freq = Counter()
+    for _, text in docs:
+        doc_freq.update(set(text.split()))
+
+    full = tfidf.TfIdfProcessor(None)
+    pruned = tfidf.TfIdfProcessor(None, min_df=args.min_df, max_df=args.max_df, max_vocab=args.max_vocab)
+    for label, processor in (("full", full), ("pruned", pruned)):
+        vocab_list = processor.prune_vocab(len(docs), doc_freq)
+        matrix, vocabulary = build_matrix(tfidf, docs, vocab_list, doc_freq, len(docs))
+        sparse_time, dense_time = time_queries(matrix, vocabulary, queries, tfidf, args.repeat)
+        dense_mib = matrix.shape[0] * matrix.shape[1] * 4 / 2 ** 20
+        print(f"{label:<7} dim {matrix.shape[1]:6d}  dense {dense_mib:8.1f} MiB  nnz {matrix.nnz:8d}  "
+              f"sparse query {sparse_time * 1e3:6.2f} ms  dense query {dense_time * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
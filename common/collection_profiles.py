@@ -0,0 +1,45 @@
+from qdrant_client.models import (
+    QuantizationSearchParams, ScalarQuantization, ScalarQuantizationConfig, ScalarType, SearchParams,
+)
+
+# Storage layouts for the dense problems_v2 collection. qdrant_initialize.py
+# creates the collection with one of these; query.py reads the quantization
+# back from the collection and searches with the matching params.
+PROFILES = {
+    # Plain float32 vectors held in RAM.
+    "float32": dict(on_disk=False, quantized=False),
+    # int8 copies in RAM drive the HNSW search; the float32 originals rescore
+    # the oversampled candidates.
+    "int8": dict(on_disk=False, quantized=True),
+    # As int8, but the float32 originals live on disk, so RAM holds roughly a
+    # quarter of the float32 profile.
+    "int8_on_disk": dict(on_disk=True, quantized=True),
+}
+DEFAULT_PROFILE = "float32"
+RESCORE_OVERSAMPLING = 2.0
+
+
+def get_profile(name):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile: {name} (expected one of {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def quantization_config(name):
+    if not get_profile(name)["quantized"]:
+        return None
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True),
+    )
+
+
+def search_params(name):
+    return search_params_for(quantization_config(name))
+
+
+def search_params_for(quantization):
+    if quantization is None:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(ignore=False, rescore=True, oversampling=RESCORE_OVERSAMPLING),
+    )
@@ -0,0 +1,172 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    # A token bucket whose refill rate is steered by the responses (AIMD):
+    # every healthy response nudges the rate up by roughly `increase` req/s per
+    # second, a 429/5xx cuts it by `decrease`, and a Retry-After pauses everyone.
+    def __init__(self, rate=5.0, min_rate=0.5, max_rate=50.0, burst=None, increase=5.0, decrease=0.5,
+                 cooldown=1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst or max(1.0, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = max(self.paused_until - now, (1.0 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, pause=None):
+        with self.lock:
+            now = time.monotonic()
+            if pause:
+                self.paused_until = max(self.paused_until, now + pause)
+            # Requests already in flight when the server pushed back all come
+            # back throttled; count that as one signal, not one per response.
+            if now - self.last_decrease < self.cooldown:
+                return
+            self.last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = 0.0
+            logger.warning(f"Throttled; request rate lowered to {self.rate:.2f}/s")
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = Counter()
+        self.started = time.monotonic()
+
+    def record(self, latency, status):
+        with self.lock:
+            self.latencies.append(latency)
+            self.statuses[status if status is not None else "error"] += 1
+
+    def summary(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            statuses = dict(self.statuses)
+        elapsed = time.monotonic() - self.started
+        if not latencies:
+            return {"requests": 0, "rate": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0, "statuses": statuses}
+        return {
+            "requests": len(latencies),
+            "rate": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "p50": latencies[len(latencies) // 2],
+            "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "max": latencies[-1],
+            "statuses": statuses,
+        }
+
+    def log(self, label="HTTP"):
+        s = self.summary()
+        logger.info(f"{label}: {s['requests']} requests ({s['rate']:.1f}/s), latency p50 {s['p50'] * 1e3:.0f} ms, "
+                    f"p95 {s['p95'] * 1e3:.0f} ms, max {s['max'] * 1e3:.0f} ms, statuses {s['statuses']}")
+
+
+class CrawlClient:
+    # One session per worker thread keeps its connections (and TLS sessions)
+    # alive across requests; sessions are not shared because neither requests
+    # nor cloudscraper sessions are documented as thread-safe.
+    def __init__(self, session_factory, limiter=None, metrics=None, max_retries=3, timeout=30.0, base_delay=1.0):
+        self.session_factory = session_factory
+        self.limiter = limiter
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.local = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = self.session_factory()
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def reset_session(self):
+        session = getattr(self.local, "session", None)
+        self.local.session = None
+        if session is not None:
+            with self.lock:
+                self.sessions.remove(session)
+            session.close()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.session().request(method, url, **kwargs)
+            except Exception:
+                self.metrics.record(time.perf_counter() - started, None)
+                if attempt == self.max_retries:
+                    raise
+                # The pooled connection may be the broken part; start over.
+                self.reset_session()
+                time.sleep(self.base_delay * (2 ** attempt) + random.uniform(0, 0.1))
+                continue
+            self.metrics.record(time.perf_counter() - started, response.status_code)
+
+            if response.status_code not in THROTTLE_STATUSES:
+                if self.limiter is not None:
+                    self.limiter.on_success()
+                return response
+            if self.limiter is not None:
+                self.limiter.on_throttle(retry_after(response))
+            elif attempt < self.max_retries:
+                time.sleep(retry_after(response) or self.base_delay * (2 ** attempt))
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self.lock:
+            sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            session.close()
@@ -0,0 +1,119 @@
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS urls_due_idx ON urls (status, next_attempt);
+"""
+
+
+class CrawlState:
+    # A local checkpoint of every URL a crawl has been given. A URL stays
+    # pending until its row is committed to Postgres, so a crawl killed at any
+    # point resumes with exactly the URLs that never landed. Failures are
+    # retried on later runs with exponential backoff and marked failed after
+    # max_attempts.
+    def __init__(self, path, max_attempts=5, base_delay=60.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.lock = threading.Lock()
+        # Fetch workers and the inserter thread all report here.
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+    def add(self, urls):
+        with self.lock:
+            self.db.executemany("INSERT OR IGNORE INTO urls (url) VALUES (?)", ((url,) for url in urls))
+            self.db.commit()
+
+    def skip_known(self, conn):
+        # One round trip for the whole pending list instead of a lookup per URL.
+        pending = self.urls("pending")
+        if not pending:
+            return 0
+        with conn.cursor() as cur:
+            cur.execute("SELECT problem_link FROM problems WHERE problem_link = ANY(%s)", (pending,))
+            known = [row[0] for row in cur]
+        self.mark_done(known)
+        return len(known)
+
+    def urls(self, status):
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT url FROM urls WHERE status = ? ORDER BY rowid", (status,))]
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            return [row[0] for row in self.db.execute(
+                "SELECT url FROM urls WHERE status = 'pending' AND next_attempt <= ? ORDER BY rowid", (now,))]
+
+    def mark_done(self, urls):
+        with self.lock:
+            self.db.executemany("UPDATE urls SET status = 'done', last_error = NULL WHERE url = ?",
+                                ((url,) for url in urls))
+            self.db.commit()
+
+    def mark_failed(self, url, error=None):
+        with self.lock:
+            row = self.db.execute("SELECT attempts FROM urls WHERE url = ?", (url,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            status = "failed" if attempts >= self.max_attempts else "pending"
+            next_attempt = time.time() + self.base_delay * (2 ** (attempts - 1))
+            self.db.execute(
+                "INSERT INTO urls (url, status, attempts, next_attempt, last_error) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET status = excluded.status, attempts = excluded.attempts, "
+                "next_attempt = excluded.next_attempt, last_error = excluded.last_error",
+                (url, status, attempts, next_attempt, error),
+            )
+            self.db.commit()
+        if status == "failed":
+            logger.error(f"Giving up on {url} after {attempts} attempts: {error}")
+
+    def requeue_failed(self):
+        with self.lock:
+            count = self.db.execute("UPDATE urls SET status = 'pending', attempts = 0, next_attempt = 0 "
+                                    "WHERE status = 'failed'").rowcount
+            self.db.commit()
+        return count
+
+    def counts(self):
+        with self.lock:
+            counts = dict(self.db.execute("SELECT status, count(*) FROM urls GROUP BY status"))
+            waiting = self.db.execute("SELECT count(*) FROM urls WHERE status = 'pending' AND next_attempt > ?",
+                                      (time.time(),)).fetchone()[0]
+        return {"pending": counts.get("pending", 0), "done": counts.get("done", 0),
+                "failed": counts.get("failed", 0), "backing_off": waiting}
+
+    def log(self, label="Crawl"):
+        c = self.counts()
+        logger.info(f"{label}: {c['done']} done, {c['pending']} pending ({c['backing_off']} backing off), "
+                    f"{c['failed']} failed")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def prepare(path, urls, conn, max_attempts=5, base_delay=60.0, retry_failed=False):
+    state = CrawlState(path, max_attempts=max_attempts, base_delay=base_delay)
+    state.add(urls)
+    if retry_failed:
+        logger.info(f"Requeued {state.requeue_failed()} URLs that had given up")
+    known = state.skip_known(conn)
+    if known:
+        logger.info(f"{known} URLs are already in problems; skipping them")
+    state.log("Checkpoint")
+    return state
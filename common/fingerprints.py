@@ -0,0 +1,85 @@
+from psycopg2.extras import execute_values
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS problem_fingerprints (
+    problem_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    PRIMARY KEY (problem_id, stage)
+)
+"""
+
+
+def ensure_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA)
+    conn.commit()
+
+
+def quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class Fingerprint:
+    # A stage's fingerprint is an md5 over the columns it reads, computed by
+    # Postgres so unchanged rows are skipped without leaving the server. The
+    # salt carries the stage's version and settings; changing it reprocesses
+    # every row.
+    def __init__(self, stage, columns, salt=""):
+        self.stage = stage
+        self.columns = columns
+        self.salt = salt
+
+    def expression(self, alias=None):
+        prefix = f"{alias}." if alias else ""
+        parts = ", ".join(f"coalesce({prefix}{column}::text, '')" for column in self.columns)
+        return f"md5(concat_ws(chr(31), {quote(self.salt)}, {parts}))"
+
+    def changed(self, alias=None):
+        prefix = f"{alias}." if alias else ""
+        return (f"NOT EXISTS (SELECT 1 FROM problem_fingerprints f WHERE f.problem_id = {prefix}id "
+                f"AND f.stage = {quote(self.stage)} AND f.fingerprint = {self.expression(alias)})")
+
+    def record(self, cur, ids):
+        # Recorded from the row as it is after the stage ran, so stages that
+        # rewrite their own input still see an unchanged row next time.
+        cur.execute(
+            f"INSERT INTO problem_fingerprints (problem_id, stage, fingerprint) "
+            f"SELECT id, %s, {self.expression()} FROM problems WHERE id = ANY(%s) "
+            f"ON CONFLICT (problem_id, stage) DO UPDATE SET fingerprint = EXCLUDED.fingerprint",
+            (self.stage, list(ids)),
+        )
+
+    def store(self, cur, fingerprints):
+        # For stages that read the fingerprint alongside their rows: a row
+        # edited while the stage was running stays marked as changed.
+        execute_values(
+            cur,
+            "INSERT INTO problem_fingerprints (problem_id, stage, fingerprint) VALUES %s "
+            "ON CONFLICT (problem_id, stage) DO UPDATE SET fingerprint = EXCLUDED.fingerprint",
+            [(pid, self.stage, value) for pid, value in fingerprints],
+            page_size=1000,
+        )
+
+    def refresh(self, cur, ids):
+        # For a later in-place stage: re-stamp rows this stage already
+        # processed, without marking rows it has never seen.
+        cur.execute(
+            f"UPDATE problem_fingerprints f SET fingerprint = {self.expression('p')} FROM problems p "
+            f"WHERE f.problem_id = p.id AND f.stage = %s AND p.id = ANY(%s)",
+            (self.stage, list(ids)),
+        )
+
+    def changed_fingerprints(self, cur):
+        cur.execute(f"SELECT p.id, {self.expression('p')} FROM problems p WHERE {self.changed('p')}")
+        return dict(cur.fetchall())
+
+    def forget(self, cur, ids):
+        cur.execute("DELETE FROM problem_fingerprints WHERE stage = %s AND problem_id = ANY(%s)",
+                    (self.stage, list(ids)))
+
+    def orphaned(self, cur):
+        # Rows this stage fingerprinted that have since been deleted.
+        cur.execute("SELECT f.problem_id FROM problem_fingerprints f WHERE f.stage = %s "
+                    "AND NOT EXISTS (SELECT 1 FROM problems p WHERE p.id = f.problem_id)", (self.stage,))
+        return [row[0] for row in cur.fetchall()]
@@ -0,0 +1,42 @@
+import numpy as np
+
+
+def randomized_svd(matrix, rank, oversample=10, power_iterations=4, seed=0):
+    # Halko, Martinsson & Tropp: sketch the range of the matrix with a random
+    # projection, sharpen it with a few power iterations, then take an exact
+    # SVD of the small (rank + oversample) x n_terms problem.
+    rng = np.random.default_rng(seed)
+    width = min(rank + oversample, min(matrix.shape))
+    sketch = matrix @ rng.standard_normal((matrix.shape[1], width)).astype(np.float32)
+    basis, _ = np.linalg.qr(sketch)
+    for _ in range(power_iterations):
+        basis, _ = np.linalg.qr(matrix.T @ basis)
+        basis, _ = np.linalg.qr(matrix @ basis)
+    small = np.asarray((matrix.T @ basis).T)
+    u_small, singular_values, vt = np.linalg.svd(small, full_matrices=False)
+    return (basis @ u_small)[:, :rank], singular_values[:rank], vt[:rank]
+
+
+def fit_projection(matrix, rank, seed=0):
+    # Docs are embedded as X @ V, so a query projects the same way and cosine
+    # similarity in the reduced space approximates the LSA similarity.
+    _, singular_values, vt = randomized_svd(matrix, rank, seed=seed)
+    return np.ascontiguousarray(vt.T, dtype=np.float32), singular_values
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def project(indices, values, projection):
+    # Term ids past the projection (added by incremental runs) have no row.
+    indices = np.asarray(indices, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float32)
+    known = indices < projection.shape[0]
+    vector = values[known] @ projection[indices[known]] if known.any() else np.zeros(projection.shape[1], np.float32)
+    return normalize_rows(vector)
+
+
+def project_matrix(matrix, projection):
+    return normalize_rows(np.asarray(matrix @ projection, dtype=np.float32))
@@ -0,0 +1,29 @@
+import os
+import redis
+
+# tf-idf.py publishes the vocab snapshot and index version that query.py reads,
+# so every script connects through here. redis_url wins; otherwise the
+# redis_host/redis_port/redis_username/redis_password variables, defaulting to
+# the shared instance. Read at call time so load_dotenv() has already run.
+DEFAULT_OPTIONS = dict(
+    host='redis-14042.crce179.ap-south-1-1.ec2.redns.redis-cloud.com',
+    port=14042,
+    username="default",
+    password="tXnxcUbI5bazp5R8mXtl9qFumLOLBMHA",
+)
+
+
+def redis_options():
+    return dict(
+        host=os.getenv("redis_host", DEFAULT_OPTIONS["host"]),
+        port=int(os.getenv("redis_port", DEFAULT_OPTIONS["port"])),
+        username=os.getenv("redis_username", DEFAULT_OPTIONS["username"]),
+        password=os.getenv("redis_password", DEFAULT_OPTIONS["password"]),
+    )
+
+
+def create_redis_client(**kwargs):
+    url = os.getenv("redis_url")
+    if url:
+        return redis.Redis.from_url(url, **kwargs)
+    return redis.Redis(**redis_options(), **kwargs)
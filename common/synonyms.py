@@ -0,0 +1,145 @@
+from collections import deque
+
+
+DSA_SYNONYMS = {
+    "dp": ["dynamic programming", "memoization", "tabulation", "recursion with cache", "recurrence relation", "dp formula"],
+    "tree dp": ["dp on tree", "dfs dp", "subtree dp"],
+    "digit dp": ["dp on digits", "number dp"],
+    "graph": ["graphs", "adjacency list", "adjacency matrix", "nodes and edges", "edges", "nodes", "vertices", "vertex"],
+    "bfs": ["breadth first search", "level order", "queue based traversal", "shortest path unweighted"],
+    "dfs": ["depth first search", "recursive graph traversal", "stack based traversal"],
+    "binary search": ["logarithmic search", "bs", "search in sorted", "parametric search"],
+    "binary search on answer": ["parametric search", "search on value space"],
+    "ternary search": ["trisection search", "unimodal search"],
+    "two pointers": ["sliding window", "double pointer", "dual pointer", "window technique", "range based pointers"],
+    "sliding window": ["window technique", "range based pointers"],
+    "segment tree": ["range tree", "range query tree", "lazy tree", "rmq"],
+    "fenwick tree": ["binary indexed tree", "bit", "prefix sum tree"],
+    "heap": ["priority queue", "min heap", "max heap"],
+    "stack": ["last in first out", "lifo"],
+    "queue": ["first in first out", "fifo"],
+    "deque": ["double ended queue", "two sided queue"],
+    "greedy": ["greedy algorithm", "locally optimal", "greedy approach", "choose best at each step"],
+    "recursion": ["recursive", "base case", "call stack"],
+    "backtracking": ["backtrack", "dfs with undo", "state restoration"],
+    "bitmask": ["bitmasks", "binary states", "masking", "bit manipulation"],
+    "bit manipulation": ["bit tricks", "bitwise operations", "masking"],
+    "prefix sum": ["cumulative sum", "running sum"],
+    "math": ["mathematics", "modulo", "modular arithmetic", "divisibility", "gcd", "lcm", "number properties"],
+    "number theory": ["modular inverse", "fermat", "modulo math", "totient", "crt"],
+    "combinatorics": ["nCr", "permutations", "factorials", "combinations", "binomial coefficient"],
+    "string": ["strings", "substring", "pattern matching", "palindrome", "text processing"],
+    "hashing": ["string hashing", "rolling hash", "hash functions"],
+    "prefix function": ["pi array", "kmp prefix"],
+    "z algorithm": ["z function", "z array"],
+    "trie": ["prefix tree", "dictionary tree", "digital tree", "trie structure", "autocomplete"],
+    "dsu": ["disjoint set union", "union find", "merge find", "disjoint set"],
+    "toposort": ["topological sort", "dag sorting"],
+    "shortest path": ["dijkstra", "bellman ford", "floyd warshall", "shortest distance", "minimum path"],
+    "mst": ["minimum spanning tree", "kruskal", "prim"],
+    "tree": ["binary tree", "n-ary tree", "dfs tree", "hierarchical structure"],
+    "binary tree": ["btree", "inorder", "preorder", "postorder"],
+    "lca": ["lowest common ancestor", "binary lifting"],
+    "articulation points": ["cut vertices", "bridge finding"],
+    "bridges": ["cut edges", "bridge finding in graph"],
+    "scc": ["strongly connected components", "kosaraju", "tarjan"],
+    "constructive algorithms": ["constructive", "building answer", "stepwise build"],
+    "interactive": ["interactive problem", "querying the judge", "standard input output", "respond to judge"],
+    "fft": ["fast fourier transform", "polynomial multiplication", "convolution", "fft in cp"],
+    "ntt": ["number theoretic transform", "modulo fft"],
+    "flows": ["maximum flow", "min cut", "ford fulkerson", "edmonds karp", "network flow"],
+    "geometry": ["computational geometry", "2d geometry", "3d geometry", "convex hull", "point location", "cross product", "angle sorting"],
+    "convex hull": ["graham scan", "monotone chain", "envelope"],
+    "game theory": ["games", "nim", "grundy", "sprague grundy", "zero sum game"],
+    "2-sat": ["two satisfiability", "implication graph"],
+    "brute force": ["complete search", "all cases", "try everything", "naive solution"],
+    "meet in the middle": ["mitm", "split and combine", "divide brute force"],
+    "matrix exponentiation": ["fast matrix power", "matrix pow"],
+    "monotonic stack": ["next greater element", "nge", "increasing stack", "decreasing stack"],
+    "monotonic queue": ["sliding window max", "queue optimization"],
+    "monotone queue optimization": ["dp optimization", "queue trick"],
+    "bitset": ["bit array", "fixed length bits", "c++ bitset"],
+    "probability": ["expected value", "expected outcome", "probabilistic approach"],
+    "line sweep": ["sweep line", "event sorting"],
+    "offline queries": ["query sorting", "mo's algorithm"],
+    "online queries": ["real-time query handling", "stream queries"],
+    "mo's algorithm": ["sqrt decomposition", "query reordering"],
+    "suffix array": ["suffix sorting", "string matching"],
+    "suffix tree": ["compressed trie", "text indexing"],
+    "tries": ["prefix tree", "autocomplete", "digital trie"],
+    "burnside": ["group counting", "polya enumeration theorem"],
+    "knapsack": ["dp knapsack", "subset sum", "bounded knapsack", "0/1 knapsack"],
+    "map": ["hash map", "unordered map", "dictionary"],
+    "set": ["unordered set", "hash set"],
+    "simulation": ["simulate", "step by step", "mimic behavior", "manual process"],
+    "recurrence": ["recurrence relation", "dp formula"],
+    "subset": ["combination of elements", "subset sum"],
+    "subsequence": ["non-contiguous sequence"],
+    "matrix": ["2d array", "grid", "table"],
+    "grid": ["matrix", "board", "cells"]
+}
+
+FLATTENED_SYNONYMS = {}
+for key, synonyms in DSA_SYNONYMS.items():
+    for phrase in synonyms:
+        FLATTENED_SYNONYMS[phrase.lower()] = key.lower()
+
+
+# Aho-Corasick automaton: reports every pattern that occurs as a substring
+# of the text in one left-to-right pass.
+class SynonymMatcher:
+    def __init__(self, patterns):
+        goto = [{}]
+        fail = [0]
+        out = [()]
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    fail.append(0)
+                    out.append(())
+                    goto[state][ch] = nxt
+                state = nxt
+            if pattern not in out[state]:
+                out[state] += (pattern,)
+
+        # Breadth-first so every state's fail target is finished before it,
+        # which lets each row inherit the full transition table of its fail
+        # state. Matching then never has to follow fail links.
+        self.delta = [None] * len(goto)
+        self.delta[0] = dict(goto[0])
+        pending = deque(goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, nxt in goto[state].items():
+                fail[nxt] = self.delta[fail[state]].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+                pending.append(nxt)
+            row = dict(self.delta[fail[state]])
+            row.update(goto[state])
+            self.delta[state] = row
+        self.out = out
+
+    def find(self, text):
+        delta = self.delta
+        out = self.out
+        state = 0
+        found = set()
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+SYNONYM_MATCHER = SynonymMatcher(list(DSA_SYNONYMS) + list(FLATTENED_SYNONYMS))
+
+
+def matched_canonicals(text_lower):
+    matched = SYNONYM_MATCHER.find(text_lower)
+    keys = {phrase for phrase in matched if phrase in DSA_SYNONYMS}
+    via_synonyms = {FLATTENED_SYNONYMS[phrase] for phrase in matched if phrase in FLATTENED_SYNONYMS}
+    return keys, via_synonyms
@@ -0,0 +1,58 @@
+import os
+from functools import lru_cache
+
+# Stemming has to match between the cleaner (index side) and query.py, so both
+# read the same switch.
+STEMMING = os.getenv("stem_terms", "0") == "1"
+# Bumped whenever stem() changes, so fingerprints salted with it re-clean.
+STEM_VERSION = 2
+
+VOWELS = frozenset("aeiouy")
+
+
+def has_vowel(text):
+    return any(c in VOWELS for c in text)
+
+
+def strip_suffix(word):
+    # Light suffix stripping: plurals plus -ing/-ed. Short tokens and stems
+    # without a vowel are left alone so names like "bfs" or "string" survive.
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "zes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    for suffix, min_stem in (("ing", 3), ("ed", 4)):
+        if word.endswith(suffix):
+            base = word[:-len(suffix)]
+            if len(base) >= min_stem and has_vowel(base):
+                if len(base) > 3 and base[-1] == base[-2] and base[-1] not in VOWELS and base[-1] not in "lsz":
+                    base = base[:-1]
+                return base
+            return word
+    return word
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    # Strip until nothing changes ("bringings" -> "bringing" -> "bring"), so
+    # stemming already-stemmed text is a no-op. The cleaner writes its output
+    # back to problem_statement, which gets cleaned again after edits.
+    while True:
+        stripped = strip_suffix(word)
+        if stripped == word:
+            return word
+        word = stripped
+
+
+def normalize_term(word):
+    return stem(word) if STEMMING else word
+
+
+def normalize_tokens(tokens):
+    if not STEMMING:
+        return list(tokens)
+    return [stem(t) for t in tokens]
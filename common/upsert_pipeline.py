@@ -0,0 +1,92 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class UpsertPipeline:
+    def __init__(self, client, in_flight=4, max_retries=5, base_delay=2.0, report_every=50):
+        self.client = client
+        self.in_flight = max(1, in_flight)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.report_every = report_every
+        self.executor = ThreadPoolExecutor(max_workers=self.in_flight, thread_name_prefix="upsert")
+        # Producers block once this many batches are queued or running, so a
+        # fast producer cannot pile up unbounded point lists in memory.
+        self.slots = threading.BoundedSemaphore(self.in_flight)
+        self.lock = threading.Lock()
+        self.last_batch = {}
+        self.batches = 0
+        self.points = 0
+        self.failed_points = 0
+        # Ids of points whose batch gave up, so callers can leave them marked
+        # as not yet written.
+        self.failed_ids = set()
+        self.retries = 0
+        self.started = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(barrier=exc_type is None)
+
+    def submit(self, collection_name, points):
+        if not points:
+            return
+        if self.started is None:
+            self.started = time.monotonic()
+        self.slots.acquire()
+        self.last_batch[collection_name] = points
+        future = self.executor.submit(self.send, collection_name, points)
+        future.add_done_callback(lambda _: self.slots.release())
+
+    def send(self, collection_name, points):
+        for attempt in range(self.max_retries + 1):
+            try:
+                # wait=False returns once Qdrant has queued the batch; close()
+                # issues the barrier that waits for everything to be applied.
+                self.client.upsert(collection_name=collection_name, points=points, wait=False)
+                self.record(len(points))
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    break
+                delay = self.base_delay * (2 ** attempt) + random.uniform(0, 0.1)
+                with self.lock:
+                    self.retries += 1
+                logger.warning(f"Upsert of {len(points)} points into {collection_name} failed "
+                               f"(attempt {attempt}): {e}, retrying in {delay:.2f}s")
+                # Only this batch's thread sleeps; the other slots keep sending.
+                time.sleep(delay)
+        logger.error(f"Failed to upsert {len(points)} points into {collection_name} after {self.max_retries} retries")
+        with self.lock:
+            self.failed_points += len(points)
+            self.failed_ids.update(getattr(point, "id", point) for point in points)
+        return False
+
+    def record(self, count):
+        with self.lock:
+            self.batches += 1
+            self.points += count
+            if self.report_every and self.batches % self.report_every == 0:
+                logger.info(f"Upserted {self.points} points ({self.rate():.1f} points/s, {self.in_flight} in flight)")
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started if self.started is not None else 0.0
+        return self.points / elapsed if elapsed > 0 else 0.0
+
+    def close(self, barrier=True):
+        self.executor.shutdown(wait=True)
+        if barrier:
+            # Updates to a collection are applied in order, so one acknowledged
+            # write after all the queued ones means they have all landed.
+            for collection_name, points in self.last_batch.items():
+                self.client.upsert(collection_name=collection_name, points=points, wait=True)
+        logger.info(f"Upserted {self.points} points in {self.batches} batches ({self.rate():.1f} points/s, "
+                    f"{self.retries} retries, {self.failed_points} failed points)")
+        return self.failed_points == 0
@@ -0,0 +1,149 @@
+import json
+import mmap
+import os
+from functools import lru_cache
+import struct
+import sys
+from array import array
+
+# Layout (little-endian):
+#   header   magic, format version, term count, dense vector dimension, term blob size
+#            (ids past the dimension are only used by sparse vectors)
+#   offsets  uint32[count + 1]  byte offsets of each term in the blob
+#   ids      uint32[count]      vector index of each term
+#   idf      float32[count]     IDF of each term
+#   blob     UTF-8 terms, concatenated in byte order
+MAGIC = b"CHVOCAB\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIIQ")
+
+
+def build_snapshot(entries, dimension=None):
+    entries = sorted(((term.encode("utf-8"), idx, value) for term, idx, value in entries),
+                     key=lambda entry: entry[0])
+    offsets = array("I", [0])
+    ids = array("I")
+    idf = array("f")
+    blob = bytearray()
+    for term, idx, value in entries:
+        blob += term
+        offsets.append(len(blob))
+        ids.append(idx)
+        idf.append(value)
+    if dimension is None:
+        dimension = max(ids) + 1 if ids else 0
+
+    if sys.byteorder != "little":
+        for section in (offsets, ids, idf):
+            section.byteswap()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(ids), dimension, len(blob))
+    return b"".join([header, offsets.tobytes(), ids.tobytes(), idf.tobytes(), bytes(blob)])
+
+
+def write_snapshot(path, entries, dimension=None):
+    data = build_snapshot(entries, dimension)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+class VocabSnapshot:
+    def __init__(self, buffer, lookup_cache_size=8192, term_index=False):
+        if sys.byteorder != "little":
+            raise RuntimeError("Vocab snapshots are little-endian and cannot be mapped on this platform")
+        magic, version, count, dimension, blob_size = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a vocab snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vocab snapshot version {version}")
+
+        view = memoryview(buffer)
+        start = HEADER.size
+        self.offsets = view[start:start + 4 * (count + 1)].cast("I")
+        start += 4 * (count + 1)
+        self.ids = view[start:start + 4 * count].cast("I")
+        start += 4 * count
+        self.idf = view[start:start + 4 * count].cast("f")
+        start += 4 * count
+        if isinstance(buffer, memoryview):
+            # Views (e.g. shared memory) do not compare as bytes, so only the
+            # term blob is copied; the id and IDF arrays stay shared.
+            buffer = buffer[start:start + blob_size].tobytes()
+            start = 0
+        self.blob_start = start
+        self.buffer = buffer
+        self.count = count
+        self.dimension = dimension
+        if term_index:
+            # Batch jobs look up every term of every document; a term -> position
+            # dict makes that O(1) while ids and IDFs stay in the buffer.
+            positions = {self.term(position).decode("utf-8"): position for position in range(count)}
+            self.find = lambda word: positions.get(word, -1)
+        else:
+            # Query terms repeat heavily (synonym expansions), so memoize the
+            # binary search for the hot ones.
+            self.lookup = lru_cache(maxsize=lookup_cache_size)(self.lookup)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return self.count
+
+    def term(self, position):
+        start = self.blob_start
+        return self.buffer[start + self.offsets[position]:start + self.offsets[position + 1]]
+
+    def find(self, word):
+        key = word.encode("utf-8")
+        buffer = self.buffer
+        offsets = self.offsets
+        base = self.blob_start
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if buffer[base + offsets[mid]:base + offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and buffer[base + offsets[lo]:base + offsets[lo + 1]] == key:
+            return lo
+        return -1
+
+    def lookup(self, word):
+        position = self.find(word)
+        if position < 0:
+            return None
+        return self.ids[position], self.idf[position]
+
+    def items(self):
+        for position in range(self.count):
+            yield self.term(position).decode("utf-8"), self.ids[position], self.idf[position]
+
+
+def vocab_dimension(snapshot_path=None, vocab_path=None):
+    # Dense collections are sized from the (pruned) vocabulary that tf-idf.py
+    # wrote, falling back to a word -> index vocab.json.
+    if snapshot_path and os.path.exists(snapshot_path):
+        return VocabSnapshot.load(snapshot_path).dimension
+    with open(vocab_path) as f:
+        vocab = json.load(f)
+    return max(vocab.values()) + 1 if vocab else 0
+
+
+class DictVocabulary:
+    def __init__(self, word2idx, idf):
+        self.word2idx = word2idx
+        self.idf = idf
+        self.dimension = len(word2idx)
+
+    def __len__(self):
+        return len(self.word2idx)
+
+    def lookup(self, word):
+        idx = self.word2idx.get(word)
+        if idx is None:
+            return None
+        return idx, self.idf.get(word, 0.0)
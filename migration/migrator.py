@@ -1,10 +1,15 @@
 import os
+import sys
 import psycopg2
 import logging
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
 from qdrant_client.http.models import PointStruct
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.fingerprints import Fingerprint, ensure_table
+from common.upsert_pipeline import UpsertPipeline
+
 
 load_dotenv()
 
@@ -17,22 +22,28 @@ qdrant_client = QdrantClient(
 )
 
 collection_name = "problems"
+fingerprint = Fingerprint("migrator", ("problem_name", "problem_link", "platform", "topics"), salt="v1")
 
-
-def fetch_all_data():
-    logging.info("Connecting to Supabase Postgres database...")
-    conn = psycopg2.connect(
+def connect_db():
+    return psycopg2.connect(
         user=os.getenv("user"),
         password=os.getenv("password"),
         host=os.getenv("host"),
         port=os.getenv("port"),
         dbname=os.getenv("dbname")
     )
+
+def fetch_all_data():
+    logging.info("Connecting to Supabase Postgres database...")
+    conn = connect_db()
+    ensure_table(conn)
     cur = conn.cursor()
 
-    cur.execute("""
-                SELECT id, problem_name, problem_link, platform,topics
+    cur.execute(f"""
+                SELECT id, problem_name, problem_link, platform,topics,
+                       {fingerprint.expression()} AS fingerprint
                 FROM problems
+                WHERE {fingerprint.changed()}
                 """)
 
     columns = [desc[0] for desc in cur.description]
@@ -48,20 +59,27 @@ def fetch_all_data():
     return data
 
 
-import time
-import random
+def placeholder_vector():
+    # This collection only carries payloads; its vectors are placeholders, so
+    # they are sized from the collection itself rather than from whatever the
+    # vocabulary currently is.
+    vectors = qdrant_client.get_collection(collection_name).config.params.vectors
+    if vectors is None or isinstance(vectors, dict):
+        return {}
+    return [0.0] * vectors.size
+
 
-def push_to_qdrant(rows, max_retries=5, base_delay=2.0):
+def push_to_qdrant(rows, in_flight=4, max_retries=5, base_delay=2.0):
+    vector = placeholder_vector()
     points = []
     for row in rows:
         pid = row.get("id")
         if pid is None:
             continue
 
-        vector_size = 25602
         point = PointStruct(
             id=int(pid),
-            vector=[0.0] * vector_size,
+            vector=vector,
             payload=row
         )
         points.append(point)
@@ -69,25 +87,30 @@ def push_to_qdrant(rows, max_retries=5, base_delay=2.0):
     BATCH_SIZE = 100
     total = len(points)
 
-    for i in range(0, total, BATCH_SIZE):
-        batch = points[i:i + BATCH_SIZE]
-        attempt = 0
-
-        while attempt <= max_retries:
-            try:
-                qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=batch
-                )
-                break
-            except Exception as e:
-                attempt += 1
-                wait_time = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 1)
-                if attempt > max_retries:
-                    logging.error(f"Failed to insert batch {i // BATCH_SIZE + 1} after {max_retries} attempts.")
-                else:
-                    time.sleep(wait_time)
+    with UpsertPipeline(qdrant_client, in_flight=in_flight, max_retries=max_retries,
+                        base_delay=base_delay) as pipeline:
+        for i in range(0, total, BATCH_SIZE):
+            pipeline.submit(collection_name, points[i:i + BATCH_SIZE])
+    return set(pipeline.failed_ids)
+
+
+def record_pushed(rows, fingerprints, failed=()):
+    # Rows whose batch gave up keep their old fingerprint, so the next run
+    # pushes them again.
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            fingerprint.store(cur, [(row["id"], value) for row, value in zip(rows, fingerprints)
+                                    if row.get("id") is not None and int(row["id"]) not in failed])
+        conn.commit()
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     all_data = fetch_all_data()
-    push_to_qdrant(all_data)
+    fingerprints = [row.pop("fingerprint") for row in all_data]
+    logging.info(f"{len(all_data)} rows changed since the last push")
+    failed = push_to_qdrant(all_data)
+    record_pushed(all_data, fingerprints, failed)
+    if failed:
+        logging.error(f"{len(failed)} points failed to upsert; rerun to retry them")
\ No newline at end of file
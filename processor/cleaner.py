@@ -1,43 +1,30 @@
 import psycopg2
+from psycopg2.extras import execute_values
 import os
-import re
+import sys
+import time
 import logging
+import argparse
+from multiprocessing import Pool
 from dotenv import load_dotenv
-import nltk
-from nltk.corpus import stopwords
 
-
-load_dotenv()
-
-
-nltk.download('stopwords')
-stop_words = set(stopwords.words('english'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.fingerprints import ensure_table
+from cleaning import CLEANER_FINGERPRINT, TextCleaner
 
 
-buzzwords = {
-    "given", "print", "find", "determine", "check", "output", "input", "consists",
-    "contains", "return", "provided", "write", "read", "you", "your", "are", "task",
-    "function", "implement", "should", "must", "need", "program", "statement",
-    "constraint", "constraints", "example", "note", "format", "description",
-    "help", "generate", "value", "values", "used", "using", "new", "valid", "used",
-    "provide", "solve", "required", "output", "true", "false", "print", "yes", "no",
-    "type", "range", "initialize", "given", "determine", "based", "result", "initialize",
-    "whether", "return", "returns", "represent", "represented", "given", "calculate"
-}
+load_dotenv()
 
 
-BATCH_SIZE = 500
+BATCH_SIZE = 2000
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+text_cleaner = TextCleaner()
+fingerprint = CLEANER_FINGERPRINT
+
 def clean_text(text):
-    text = text.encode('ascii', 'ignore').decode('ascii')
-    text = re.sub(r'<[^>]+>', ' ', text)
-    text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-    text = text.lower()
-    tokens = text.split()
-    tokens = [t for t in tokens if t not in stop_words and t not in buzzwords]
-    return ' '.join(tokens)
+    return text_cleaner.clean(text)
 
 def connect_db():
     return psycopg2.connect(
@@ -48,33 +35,115 @@ def connect_db():
         dbname=os.getenv("dbname")
     )
 
-def update_problem_statements():
+def write_updates(conn, updates, processed_ids):
+    # One UPDATE ... FROM (VALUES ...) per page instead of a statement per row.
+    with conn.cursor() as cur:
+        if updates:
+            execute_values(
+                cur,
+                "UPDATE problems AS p SET problem_statement = v.statement "
+                "FROM (VALUES %s) AS v(id, statement) WHERE p.id = v.id",
+                updates,
+                template="(%s::integer, %s)",
+                page_size=BATCH_SIZE,
+            )
+        fingerprint.record(cur, processed_ids)
+    conn.commit()
+
+def update_problem_statements(id_range=None):
+    read_conn = None
+    write_conn = None
     try:
-        conn = connect_db()
-        cur = conn.cursor()
-
-
-        cur.execute("SELECT id, problem_statement, topics FROM problems")
-        all_rows = cur.fetchall()
-        logging.info(f"Fetched {len(all_rows)} rows")
-
-        updates = []
-        for idx, (pid, statement, topics) in enumerate(all_rows):
-            combined_text = f"{statement or ''} {' '.join(topics or [])}"
-            cleaned = clean_text(combined_text)
-            updates.append((cleaned, pid))
-
-            if len(updates) == BATCH_SIZE or idx == len(all_rows) - 1:
-                cur.executemany("UPDATE problems SET problem_statement = %s WHERE id = %s", updates)
-                conn.commit()
-                logging.info(f"Updated batch of {len(updates)} rows")
-                updates = []
+        # The named cursor streams rows from the server and keeps its own
+        # transaction open, so writes go through a second connection.
+        read_conn = connect_db()
+        write_conn = connect_db()
+        started = time.monotonic()
+        seen = 0
+        written = 0
+
+        with read_conn.cursor(name="cleaner_cursor") as cur:
+            cur.itersize = BATCH_SIZE
+            query = f"SELECT id, problem_statement, topics FROM problems WHERE {fingerprint.changed()}"
+            if id_range is None:
+                cur.execute(query + " ORDER BY id")
+            else:
+                cur.execute(query + " AND id BETWEEN %s AND %s ORDER BY id", id_range)
+
+            updates = []
+            processed_ids = []
+            for pid, statement, topics in cur:
+                seen += 1
+                processed_ids.append(pid)
+                combined_text = f"{statement or ''} {' '.join(topics or [])}"
+                cleaned = clean_text(combined_text)
+                if cleaned != statement:
+                    updates.append((pid, cleaned))
+
+                if len(processed_ids) == BATCH_SIZE:
+                    write_updates(write_conn, updates, processed_ids)
+                    written += len(updates)
+                    logging.info(f"Updated {written} of {seen} changed rows")
+                    updates = []
+                    processed_ids = []
+            if processed_ids:
+                write_updates(write_conn, updates, processed_ids)
+                written += len(updates)
+
+        elapsed = time.monotonic() - started
+        label = f"ids {id_range[0]}-{id_range[1]}" if id_range else "all ids"
+        logging.info(f"Cleaned {seen} rows ({label}), updated {written} in {elapsed:.1f}s "
+                     f"({seen / max(elapsed, 1e-9):.0f} rows/s)")
+        return seen, written
 
     except Exception as e:
         logging.error(f"Error: {e}")
+        return 0, 0
+    finally:
+        for conn in (read_conn, write_conn):
+            if conn is not None:
+                conn.close()
+
+def id_ranges(parts):
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT min(id), max(id) FROM problems")
+            low, high = cur.fetchone()
     finally:
-        cur.close()
         conn.close()
+    if low is None:
+        return []
+    step = max(1, -(-(high - low + 1) // parts))
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+def clean_in_parallel(workers):
+    # Each worker streams and writes back its own id range over its own
+    # connections; the stopword set and translate table are inherited.
+    ranges = id_ranges(workers)
+    started = time.monotonic()
+    with Pool(workers) as pool:
+        results = pool.map(update_problem_statements, ranges)
+    seen = sum(r[0] for r in results)
+    written = sum(r[1] for r in results)
+    elapsed = time.monotonic() - started
+    logging.info(f"Cleaned {seen} rows with {workers} workers, updated {written} in {elapsed:.1f}s "
+                 f"({seen / max(elapsed, 1e-9):.0f} rows/s)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Clean problem statements in place")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes, each cleaning one id range (default: CPU count)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    update_problem_statements()
+    args = parse_args()
+    conn = connect_db()
+    try:
+        ensure_table(conn)
+    finally:
+        conn.close()
+    if args.workers > 1:
+        clean_in_parallel(args.workers)
+    else:
+        update_problem_statements()
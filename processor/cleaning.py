@@ -0,0 +1,71 @@
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.fingerprints import Fingerprint
+from common.text import STEMMING, STEM_VERSION, normalize_tokens
+
+# Cached under the user's cache directory, not the source tree.
+STOPWORDS_PATH = os.getenv(
+    "stopwords_path",
+    os.path.join(os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                 "code-hunt", "stopwords_english.txt"),
+)
+
+BUZZWORDS = frozenset({
+    "given", "print", "find", "determine", "check", "output", "input", "consists",
+    "contains", "return", "provided", "write", "read", "you", "your", "are", "task",
+    "function", "implement", "should", "must", "need", "program", "statement",
+    "constraint", "constraints", "example", "note", "format", "description",
+    "help", "generate", "value", "values", "used", "using", "new", "valid",
+    "provide", "solve", "required", "true", "false", "yes", "no",
+    "type", "range", "initialize", "based", "result",
+    "whether", "returns", "represent", "represented", "calculate"
+})
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Bump the version when TextCleaner's output changes so every row is cleaned
+# again by cleaner.py.
+CLEANER_FINGERPRINT = Fingerprint("cleaner", ("problem_statement", "topics"), salt=f"v1 stem={STEM_VERSION if STEMMING else 0}")
+
+
+def load_stopwords(path=STOPWORDS_PATH):
+    # nltk.download() goes to the network on every call, so the list is
+    # fetched once and kept as a plain text file after that.
+    if os.path.exists(path):
+        with open(path) as f:
+            return frozenset(line.strip() for line in f if line.strip())
+    import nltk
+    nltk.download('stopwords', quiet=True)
+    from nltk.corpus import stopwords
+    words = sorted(set(stopwords.words('english')))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("\n".join(words) + "\n")
+    return frozenset(words)
+
+
+# One 256-byte table does the regex passes' work in a single C-level call:
+# letters are lowercased and every other byte becomes a space. Non-ASCII is
+# dropped by the encode step beforehand, as the old encode/decode did.
+ASCII_LETTERS = bytes(
+    (c | 0x20) if chr(c).isascii() and chr(c).isalpha() else ord(" ")
+    for c in range(256)
+)
+
+
+class TextCleaner:
+    def __init__(self, stop_words=None, buzzwords=BUZZWORDS, stem=True):
+        stop_words = load_stopwords() if stop_words is None else stop_words
+        self.dropped = frozenset(stop_words) | frozenset(buzzwords)
+        self.stem = stem
+
+    def clean(self, text):
+        if "<" in text:
+            text = TAG_PATTERN.sub(' ', text)
+        dropped = self.dropped
+        text = text.encode('ascii', 'ignore').translate(ASCII_LETTERS).decode('ascii')
+        tokens = [t for t in text.split() if t not in dropped]
+        return ' '.join(normalize_tokens(tokens) if self.stem else tokens)
@@ -0,0 +1,188 @@
+import psycopg2
+from psycopg2.extras import execute_values
+import os
+import sys
+import time
+import logging
+import argparse
+from multiprocessing import Pool
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.fingerprints import Fingerprint, ensure_table
+from common.text import STEMMING, STEM_VERSION, normalize_tokens
+from cleaning import TextCleaner
+from improved_statements import add_synonyms_to_text
+
+load_dotenv()
+
+BATCH_SIZE = 2000
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# The raw problem_statement is never modified; every run derives search_text
+# from it again, so reruns and partial runs cannot compound.
+SCHEMA = "ALTER TABLE problems ADD COLUMN IF NOT EXISTS search_text TEXT"
+
+
+def connect_db():
+    return psycopg2.connect(
+        user=os.getenv("user"),
+        password=os.getenv("password"),
+        host=os.getenv("host"),
+        port=os.getenv("port"),
+        dbname=os.getenv("dbname")
+    )
+
+
+text_cleaner = TextCleaner(stem=False)
+
+
+def clean(text):
+    return text_cleaner.clean(text)
+
+
+def augment(text):
+    return add_synonyms_to_text(text)
+
+
+def tokenize(text):
+    # Stemming runs last so the synonym matcher still sees whole words.
+    return ' '.join(normalize_tokens(text.split()))
+
+
+STAGES = {"clean": clean, "augment": augment, "tokenize": tokenize}
+DEFAULT_STAGES = ("clean", "augment", "tokenize")
+
+# Bump the version when a stage's output changes so every row is derived again.
+PIPELINE_VERSION = "v1"
+
+
+def pipeline_fingerprint(names=DEFAULT_STAGES):
+    return Fingerprint("pipeline", ("problem_statement", "topics"),
+                       salt=f"{PIPELINE_VERSION} {','.join(names)} stem={STEM_VERSION if STEMMING else 0}")
+
+
+def build_pipeline(names=DEFAULT_STAGES):
+    stages = [STAGES[name] for name in names]
+
+    def run(statement, topics):
+        text = f"{statement or ''} {' '.join(topics or [])}"
+        for stage in stages:
+            text = stage(text)
+        return text
+
+    return run
+
+
+def write_search_text(conn, updates, fingerprint, processed_ids):
+    with conn.cursor() as cur:
+        if updates:
+            execute_values(
+                cur,
+                "UPDATE problems AS p SET search_text = v.search_text "
+                "FROM (VALUES %s) AS v(id, search_text) WHERE p.id = v.id",
+                updates,
+                template="(%s::integer, %s)",
+                page_size=BATCH_SIZE,
+            )
+        fingerprint.record(cur, processed_ids)
+    conn.commit()
+
+
+def process_range(id_range=None, stage_names=DEFAULT_STAGES):
+    run = build_pipeline(stage_names)
+    fingerprint = pipeline_fingerprint(stage_names)
+    read_conn = None
+    write_conn = None
+    try:
+        read_conn = connect_db()
+        write_conn = connect_db()
+        started = time.monotonic()
+        seen = 0
+        written = 0
+
+        with read_conn.cursor(name="pipeline_cursor") as cur:
+            cur.itersize = BATCH_SIZE
+            query = f"SELECT id, problem_statement, topics, search_text FROM problems WHERE {fingerprint.changed()}"
+            if id_range is None:
+                cur.execute(query + " ORDER BY id")
+            else:
+                cur.execute(query + " AND id BETWEEN %s AND %s ORDER BY id", id_range)
+
+            updates = []
+            processed_ids = []
+            for pid, statement, topics, search_text in cur:
+                seen += 1
+                processed_ids.append(pid)
+                derived = run(statement, topics)
+                if derived != search_text:
+                    updates.append((pid, derived))
+                if len(processed_ids) == BATCH_SIZE:
+                    write_search_text(write_conn, updates, fingerprint, processed_ids)
+                    written += len(updates)
+                    logging.info(f"Wrote search_text for {written} of {seen} changed rows")
+                    updates = []
+                    processed_ids = []
+            if processed_ids:
+                write_search_text(write_conn, updates, fingerprint, processed_ids)
+                written += len(updates)
+
+        elapsed = time.monotonic() - started
+        logging.info(f"Processed {seen} rows, wrote {written} in {elapsed:.1f}s ({seen / max(elapsed, 1e-9):.0f} rows/s)")
+        return seen, written
+
+    except Exception as e:
+        logging.error(f"Error: {e}")
+        return 0, 0
+    finally:
+        for conn in (read_conn, write_conn):
+            if conn is not None:
+                conn.close()
+
+
+def ensure_schema():
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA)
+        conn.commit()
+        ensure_table(conn)
+    finally:
+        conn.close()
+
+
+def id_ranges(parts):
+    conn = connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT min(id), max(id) FROM problems")
+            low, high = cur.fetchone()
+    finally:
+        conn.close()
+    if low is None:
+        return []
+    step = max(1, -(-(high - low + 1) // parts))
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Derive problems.search_text from the raw statements in one pass")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(DEFAULT_STAGES),
+                        help="stages to run, in order (default: clean augment tokenize)")
+    parser.add_argument("--workers", type=int, default=1, help="processes, each handling one id range")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    ensure_schema()
+    if args.workers > 1:
+        with Pool(args.workers) as pool:
+            results = pool.starmap(process_range, [(r, tuple(args.stages)) for r in id_ranges(args.workers)])
+        logging.info(f"Processed {sum(r[0] for r in results)} rows, wrote {sum(r[1] for r in results)}")
+    else:
+        process_range(stage_names=tuple(args.stages))
+
+
+if __name__ == "__main__":
+    main()
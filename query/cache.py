@@ -0,0 +1,131 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class RedisResultCache:
+    def __init__(self, client, prefix="search_cache", ttl=3600, max_entries=20000, max_value_bytes=64 * 1024,
+                 version_key="search_index_version", version_refresh=5.0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_value_bytes = max_value_bytes
+        self.version_key = version_key
+        self.version_refresh = version_refresh
+        self.version = "0"
+        self.version_checked_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def index_version(self):
+        now = time.monotonic()
+        if now - self.version_checked_at >= self.version_refresh:
+            try:
+                self.version = str(self.client.get(self.version_key) or "0")
+            except Exception:
+                self.errors += 1
+            self.version_checked_at = now
+        return self.version
+
+    def refresh_version(self):
+        self.version_checked_at = float("-inf")
+
+    def redis_key(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()[:24]
+        return f"{self.prefix}:{self.index_version()}:{digest}"
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.redis_key(key))
+        except Exception:
+            self.errors += 1
+            return None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        size = len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+        if size > self.max_value_bytes:
+            return
+        redis_key = self.redis_key(key)
+        index_key = f"{self.prefix}:keys"
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(redis_key, value, ex=self.ttl)
+            pipe.zadd(index_key, {redis_key: time.time()})
+            pipe.zcard(index_key)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                evicted = [member for member, _ in self.client.zpopmin(index_key, size - self.max_entries)]
+                if evicted:
+                    self.client.delete(*evicted)
+        except Exception:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
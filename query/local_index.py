@@ -0,0 +1,123 @@
+import json
+from collections import defaultdict
+import numpy as np
+from scipy import sparse
+
+
+class LocalIndex:
+    def __init__(self, matrix, ids, payloads):
+        # Column-major copy so a query only touches the postings of its own terms.
+        self.by_term = sparse.csc_matrix(matrix, dtype=np.float32)
+        self.ids = ids
+        self.payloads = payloads
+        self.postings = {}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            matrix = sparse.csr_matrix(
+                (data["data"], data["indices"], data["indptr"]),
+                shape=tuple(data["shape"]),
+            )
+            ids = data["ids"]
+            payloads = json.loads(data["payloads"].tobytes().decode("utf-8"))
+        return cls(matrix, ids, payloads)
+
+    @property
+    def vocab_size(self):
+        return self.by_term.shape[1]
+
+    def __len__(self):
+        return self.by_term.shape[0]
+
+    def known_terms(self, indices, values):
+        # Incremental reindexing appends term ids the saved matrix has no column for.
+        size = self.vocab_size
+        if indices and indices[-1] >= size:
+            pairs = [(i, v) for i, v in zip(indices, values) if i < size]
+            return [i for i, _ in pairs], [v for _, v in pairs]
+        return indices, values
+
+    def score(self, indices, values):
+        indices, values = self.known_terms(indices, values)
+        if not indices:
+            return np.zeros(len(self), dtype=np.float32)
+        columns = self.by_term[:, indices]
+        return columns @ np.asarray(values, dtype=np.float32)
+
+    def top_k(self, scores, k):
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        # Ties go to the lower row, so a ranking of depth k is always a
+        # prefix of a deeper one and paging across depths never repeats hits.
+        if k < scores.shape[0]:
+            kth = -np.partition(-scores, k - 1)[k - 1]
+            top = np.flatnonzero(scores >= kth)
+        else:
+            top = np.arange(scores.shape[0])
+        return top[np.argsort(-scores[top], kind="stable")][:k]
+
+    def field_postings(self, field):
+        postings = self.postings.get(field)
+        if postings is None:
+            grouped = defaultdict(list)
+            for row, payload in enumerate(self.payloads):
+                value = payload.get(field)
+                for item in ([value] if isinstance(value, str) else value or []):
+                    grouped[item].append(row)
+            postings = {item: np.asarray(rows, dtype=np.int64) for item, rows in grouped.items()}
+            self.postings[field] = postings
+        return postings
+
+    def filter_mask(self, filters):
+        mask = np.ones(len(self), dtype=bool)
+        for field, wanted in filters.items():
+            postings = self.field_postings(field)
+            field_mask = np.zeros(len(self), dtype=bool)
+            for item in wanted:
+                rows = postings.get(item)
+                if rows is not None:
+                    field_mask[rows] = True
+            mask &= field_mask
+        return mask
+
+    def facet_counts(self, field, filters):
+        mask = self.filter_mask(filters) if filters else None
+        counts = {}
+        for item, rows in self.field_postings(field).items():
+            count = int(mask[rows].sum()) if mask is not None else len(rows)
+            if count:
+                counts[item] = count
+        return counts
+
+    def ranked(self, scores, limit, mask):
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            limit = min(limit, int(mask.sum()))
+        return [(int(row), float(scores[row])) for row in self.top_k(scores, limit)]
+
+    def search(self, indices, values, limit, filters=None):
+        mask = self.filter_mask(filters) if filters else None
+        return self.ranked(self.score(indices, values), limit, mask)
+
+    def search_many(self, vectors, limit, filters=None):
+        # One sparse matrix-matrix product scores every query in the batch.
+        indptr = [0]
+        indices = []
+        values = []
+        for query_indices, query_values in vectors:
+            query_indices, query_values = self.known_terms(query_indices, query_values)
+            indices.extend(query_indices)
+            values.extend(query_values)
+            indptr.append(len(indices))
+        queries = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(vectors), self.vocab_size),
+        )
+        scores = (queries @ self.by_term.T).toarray()
+        mask = self.filter_mask(filters) if filters else None
+        return [self.ranked(query_scores, limit, mask) for query_scores in scores]
+
+    def payload(self, row):
+        return self.payloads[row]
@@ -1,139 +1,116 @@
-import redis
 import json
+import base64
+import hashlib
 import math
 from collections import defaultdict
-from qdrant_client.models import PointStruct
+import numpy as np
+from qdrant_client.models import (PointStruct, SparseVector, QueryRequest, Filter, FieldCondition,
+                                  MatchAny)
 from qdrant_client import QdrantClient
 import os
 import sys
+import threading
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.synonyms import DSA_SYNONYMS, matched_canonicals
+from common.vocab_snapshot import VocabSnapshot, DictVocabulary
+from common.text import normalize_term
+from common.lsa import project
+from common.collection_profiles import search_params_for
+from common.redis_config import create_redis_client
+from cache import ResultCache, RedisResultCache
+
 load_dotenv()
 
-DSA_SYNONYMS = {
-    "dp": ["dynamic programming", "memoization", "tabulation", "recurrence relation",
-           "dp formula"],
-    "tree dp": ["dp on tree", "dfs dp", "subtree dp"],
-    "digit dp": ["dp on digits", "number dp"],
-    "graph": ["graphs", "adjacency list", "adjacency matrix", "nodes and edges", "edges", "nodes", "vertices",
-              "vertex"],
-    "bfs": ["breadth first search", "level order", "queue based traversal", "shortest path unweighted"],
-    "dfs": ["depth first search", "recursive graph traversal", "stack based traversal"],
-    "binary search": ["logarithmic search", "bs", "search in sorted", "parametric search"],
-    "binary search on answer": ["parametric search", "search on value space"],
-    "ternary search": ["trisection search", "unimodal search"],
-    "two pointers": ["sliding window", "double pointer", "dual pointer", "window technique", "range based pointers"],
-    "sliding window": ["window technique", "range based pointers"],
-    "segment tree": ["range tree", "range query tree", "lazy tree", "rmq"],
-    "fenwick tree": ["binary indexed tree", "bit", "prefix sum tree"],
-    "heap": ["priority queue", "min heap", "max heap"],
-    "stack": ["last in first out", "lifo"],
-    "queue": ["first in first out", "fifo"],
-    "deque": ["double ended queue", "two sided queue"],
-    "greedy": ["greedy algorithm", "locally optimal", "greedy approach", "choose best at each step"],
-    "recursion": ["recursive", "base case", "call stack"],
-    "backtracking": ["backtrack", "dfs with undo", "state restoration"],
-    "bitmask": ["bitmasks", "binary states", "masking", "bit manipulation"],
-    "bit manipulation": ["bit tricks", "bitwise operations", "masking"],
-    "prefix sum": ["cumulative sum", "running sum"],
-    "math": ["mathematics", "modulo", "modular arithmetic", "divisibility", "gcd", "lcm", "number properties"],
-    "number theory": ["modular inverse", "fermat", "modulo math", "totient", "crt"],
-    "combinatorics": ["nCr", "permutations", "factorials", "combinations", "binomial coefficient"],
-    "string": ["strings", "substring", "pattern matching", "palindrome", "text processing"],
-    "hashing": ["string hashing", "rolling hash", "hash functions"],
-    "prefix function": ["pi array", "kmp prefix"],
-    "z algorithm": ["z function", "z array"],
-    "trie": ["prefix tree", "dictionary tree", "digital tree", "tries structure", "autocomplete"],
-    "dsu": ["disjoint set union", "union find", "merge find", "disjoint set"],
-    "toposort": ["topological sort", "dag sorting"],
-    "shortest path": ["dijkstra", "bellman ford", "floyd warshall", "shortest distance", "minimum path"],
-    "mst": ["minimum spanning tree", "kruskal", "prim"],
-    "tree": ["binary tree", "n-ary tree", "dfs tree", "hierarchical structure"],
-    "binary tree": ["btree", "inorder", "preorder", "postorder"],
-    "lca": ["lowest common ancestor", "binary lifting"],
-    "articulation points": ["cut vertices", "bridge finding"],
-    "bridges": ["cut edges", "bridge finding in graph"],
-    "scc": ["strongly connected components", "kosaraju", "tarjan"],
-    "constructive algorithms": ["constructive", "building answer", "stepwise build"],
-    "interactive": ["interactive problem", "querying the judge", "standard input output", "respond to judge"],
-    "fft": ["fast fourier transform", "polynomial multiplication", "convolution", "fft in cp"],
-    "ntt": ["number theoretic transform", "modulo fft"],
-    "flows": ["maximum flow", "min cut", "ford fulkerson", "edmonds karp", "network flow"],
-    "geometry": ["computational geometry", "2d geometry", "3d geometry", "convex hull", "point location",
-                 "cross product", "angle sorting"],
-    "convex hull": ["graham scan", "monotone chain", "envelope"],
-    "game theory": ["games", "nim", "grundy", "sprague grundy", "zero sum game"],
-    "2-sat": ["two satisfiability", "implication graph"],
-    "brute force": ["complete search", "all cases", "try everything", "naive solution"],
-    "meet in the middle": ["mitm", "split and combine", "divide brute force"],
-    "matrix exponentiation": ["fast matrix power", "matrix pow"],
-    "monotonic stack": ["next greater element", "nge", "increasing stack", "decreasing stack"],
-    "monotonic queue": ["sliding window max", "queue optimization"],
-    "monotone queue optimization": ["dp optimization", "queue trick"],
-    "bitset": ["bit array", "fixed length bits", "c++ bitset"],
-    "probability": ["expected value", "expected outcome", "probabilistic approach"],
-    "line sweep": ["sweep line", "event sorting"],
-    "offline queries": ["query sorting", "mo's algorithm"],
-    "online queries": ["real-time query handling", "stream queries"],
-    "mo's algorithm": ["sqrt decomposition", "query reordering"],
-    "suffix array": ["suffix sorting", "string matching"],
-    "suffix tree": ["compressed trie", "text indexing"],
-    "tries": ["prefix tree", "autocomplete", "digital trie"],
-    "burnside": ["group counting", "polya enumeration theorem"],
-    "knapsack": ["dp knapsack", "subset sum", "bounded knapsack", "0/1 knapsack"],
-    "map": ["hash map", "unordered map", "dictionary"],
-    "set": ["unordered set", "hash set"],
-    "simulation": ["simulate", "step by step", "mimic behavior", "manual process"],
-    "recurrence": ["recurrence relation", "dp formula"],
-    "subset": ["combination of elements", "subset sum"],
-    "subsequence": ["non-contiguous sequence"],
-    "matrix": ["2d array", "grid", "table"],
-    "grid": ["matrix", "board", "cells"]
-}
-
-
-FLATTENED_SYNONYMS = {}
-for key, synonyms in DSA_SYNONYMS.items():
-    for phrase in synonyms:
-        FLATTENED_SYNONYMS[phrase.lower()] = key.lower()
-
-r = redis.Redis(
-    host='redis-14042.crce179.ap-south-1-1.ec2.redns.redis-cloud.com',
-    port=14042,
-    username="default",
-    password="tXnxcUbI5bazp5R8mXtl9qFumLOLBMHA",
-    decode_responses=True,
+DENSE_COLLECTION = "problems_v2"
+SPARSE_COLLECTION = "problems_sparse"
+SPARSE_VECTOR_NAME = "tfidf"
+LSA_COLLECTION = "problems_lsa"
+COLLECTIONS = {"dense": DENSE_COLLECTION, "sparse": SPARSE_COLLECTION, "lsa": LSA_COLLECTION}
+VECTOR_MODE = os.getenv("search_vector_mode", "dense")
+SEARCH_BACKEND = os.getenv("search_backend", "qdrant")
+LOCAL_INDEX_PATH = os.getenv(
+    "local_index_path",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "problems_index.npz"),
+)
+LSA_PROJECTION_PATH = os.getenv(
+    "lsa_projection_path",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "lsa_projection.npy"),
+)
+VOCAB_SNAPSHOT_PATH = os.getenv("vocab_snapshot_path")
+VOCAB_SNAPSHOT_KEY = "vocab_snapshot"
+SEARCH_LIMIT = 100
+QDRANT_BATCH_SIZE = 64
+FACET_LIMIT = 100
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+# The first page ranks only itself plus this many pages ahead; the deeper
+# ranking is built the first time a cursor goes past that.
+PAGE_LOOKAHEAD = int(os.getenv("search_page_lookahead", "1"))
+CURSOR_DEPTH = int(os.getenv("search_cursor_depth", "200"))
+PAGING_FIELDS = ("offset", "limit", "cursor", "score_threshold")
+FILTER_FIELDS = ("platform", "topics")
+PLATFORMS = {"codeforces": "Codeforces", "leetcode": "LeetCode"}
+LOCAL_BATCH_SIZE = 256
+RESULT_FIELDS = ["problem_name", "problem_link", "platform"]
+CACHE_INVALIDATE_CHANNEL = "search_cache_invalidate"
+
+result_cache = ResultCache(
+    maxsize=int(os.getenv("search_cache_size", "1024")),
+    ttl=float(os.getenv("search_cache_ttl", "300")),
 )
 
+r = create_redis_client(decode_responses=True)
+
+redis_cache = RedisResultCache(
+    r,
+    ttl=int(os.getenv("search_redis_cache_ttl", "3600")),
+    max_entries=int(os.getenv("search_redis_cache_entries", "20000")),
+) if os.getenv("search_redis_cache", "0") == "1" else None
+
 qdrant = QdrantClient(
     url=os.getenv("qdrant_url"),
     api_key=os.getenv("qdrant_apikey"),
     timeout=300.0
 )
 
-idf = json.loads(r.get("idf_json"))
-vocab = json.loads(r.get("vocab_json"))
-word2idx = {w: i for i, w in enumerate(vocab)}
+
+def load_vocabulary():
+    if VOCAB_SNAPSHOT_PATH and os.path.exists(VOCAB_SNAPSHOT_PATH):
+        return VocabSnapshot.load(VOCAB_SNAPSHOT_PATH)
+
+    raw_client = create_redis_client()
+    try:
+        snapshot = raw_client.get(VOCAB_SNAPSHOT_KEY)
+    finally:
+        raw_client.close()
+    if snapshot is not None:
+        return VocabSnapshot(snapshot)
+
+    print("No vocab snapshot found, falling back to idf_json/vocab_json", file=sys.stderr)
+    idf = json.loads(r.get("idf_json"))
+    vocab = json.loads(r.get("vocab_json"))
+    return DictVocabulary({w: i for i, w in enumerate(vocab)}, idf)
+
+
+vocabulary = load_vocabulary()
+local_index = None
+lsa_projection = None
+dense_search_params = None
+# Workers are long-lived; a reindex can renumber terms or change the
+# dimension, so the vocabulary is swapped out between requests, never during
+# one. Reentrant because the invalidate_cache op swaps from inside a request.
+index_lock = threading.RLock()
 
 def expand_query(query):
     original_words = query.lower().split()
     expanded_terms = set(original_words)
 
-    for word in original_words:
-        if word in DSA_SYNONYMS:
-            expanded_terms.update(DSA_SYNONYMS[word])
-
-    query_lower = query.lower()
-    for canonical, synonyms in DSA_SYNONYMS.items():
-        if canonical in query_lower:
-            expanded_terms.update(synonyms)
-            expanded_terms.add(canonical)
-
-    for synonym, canonical in FLATTENED_SYNONYMS.items():
-        if synonym in query_lower:
-            expanded_terms.add(canonical)
-            if canonical in DSA_SYNONYMS:
-                expanded_terms.update(DSA_SYNONYMS[canonical])
+    keys, via_synonyms = matched_canonicals(query.lower())
+    for canonical in keys | via_synonyms:
+        expanded_terms.add(canonical)
+        expanded_terms.update(DSA_SYNONYMS[canonical])
 
     expanded_query = " ".join(expanded_terms)
     if len(expanded_terms) > len(original_words):
@@ -144,49 +121,497 @@ def expand_query(query):
     return expanded_query
 
 
-def tfidf_vector(text):
+def tfidf_sparse_vector(text):
     count = defaultdict(int)
     for w in text.strip().split():
-        count[w] += 1
+        count[normalize_term(w)] += 1
     total = sum(count.values())
-    vec = [0.0] * len(word2idx)
+    weights = {}
     for w, c in count.items():
-        if w in word2idx:
+        entry = vocabulary.lookup(w)
+        if entry is not None:
             tf = c / total
-            vec[word2idx[w]] = tf * idf.get(w, 0)
-    norm = math.sqrt(sum(x * x for x in vec))
-    return [x / norm for x in vec] if norm else vec
+            weight = tf * entry[1]
+            if weight:
+                weights[entry[0]] = weight
+    indices = sorted(weights)
+    norm = math.sqrt(sum(x * x for x in weights.values()))
+    values = [weights[i] / norm for i in indices] if norm else []
+    return indices, values
+
+
+def tfidf_vector(text):
+    indices, values = tfidf_sparse_vector(text)
+    vec = [0.0] * vocabulary.dimension
+    for i, v in zip(indices, values):
+        # Terms added by an incremental reindex only exist in sparse vectors.
+        if i < vocabulary.dimension:
+            vec[i] = v
+    return vec
+
+def get_local_index():
+    global local_index
+    if local_index is None:
+        # Imported lazily so the Qdrant backend does not need scipy.
+        from local_index import LocalIndex
+        index = LocalIndex.load(LOCAL_INDEX_PATH)
+        if index.vocab_size != vocabulary.dimension:
+            raise ValueError(
+                f"Local index has {index.vocab_size} terms but the vocabulary has {vocabulary.dimension}"
+            )
+        local_index = index
+    return local_index
+
+
+def get_lsa_projection():
+    global lsa_projection
+    if lsa_projection is None:
+        projection = np.load(LSA_PROJECTION_PATH, mmap_mode="r")
+        if projection.shape[0] != vocabulary.dimension:
+            raise ValueError(
+                f"LSA projection has {projection.shape[0]} terms but the vocabulary has {vocabulary.dimension}"
+            )
+        lsa_projection = projection
+    return lsa_projection
+
+
+def get_dense_search_params():
+    global dense_search_params
+    if dense_search_params is None:
+        # Read from the collection itself, so the params follow whatever
+        # profile the collection behind the alias was built with. Kept in a
+        # tuple because None (unquantized) is a valid answer.
+        config = qdrant.get_collection(DENSE_COLLECTION).config
+        quantization = config.quantization_config
+        if quantization is None and not isinstance(config.params.vectors, dict):
+            quantization = config.params.vectors.quantization_config
+        dense_search_params = (search_params_for(quantization),)
+    return dense_search_params[0]
+
+
+def format_result(payload):
+    payload = payload or {}
+    return {field: payload.get(field, "N/A") for field in RESULT_FIELDS}
 
-def search(query):
-    expanded_query = expand_query(query)
-    vec = tfidf_vector(expanded_query)
 
+def qdrant_query(expanded_query, vector_mode):
+    if vector_mode == "sparse":
+        indices, values = tfidf_sparse_vector(expanded_query)
+        return SPARSE_COLLECTION, SparseVector(indices=indices, values=values), SPARSE_VECTOR_NAME
+    if vector_mode == "dense":
+        return DENSE_COLLECTION, tfidf_vector(expanded_query), None
+    if vector_mode == "lsa":
+        indices, values = tfidf_sparse_vector(expanded_query)
+        return LSA_COLLECTION, project(indices, values, get_lsa_projection()).tolist(), None
+    raise ValueError(f"Unknown vector mode: {vector_mode}")
+
+
+def normalize_filters(filters):
+    normalized = {}
+    for field in FILTER_FIELDS:
+        value = (filters or {}).get(field)
+        values = [value] if isinstance(value, str) else list(value or [])
+        values = [v.strip() for v in values if isinstance(v, str) and v.strip()]
+        if field == "platform":
+            if any(v.lower() == "all" for v in values):
+                continue
+            values = [PLATFORMS.get(v.lower(), v) for v in values]
+        if values:
+            normalized[field] = sorted(set(values))
+    return normalized
+
+
+def qdrant_filter(filters):
+    if not filters:
+        return None
+    return Filter(must=[
+        FieldCondition(key=field, match=MatchAny(any=values))
+        for field, values in filters.items()
+    ])
+
+
+def qdrant_search_params(vector_mode):
+    return get_dense_search_params() if vector_mode == "dense" else None
+
+
+def qdrant_collection(vector_mode):
+    return COLLECTIONS.get(vector_mode, DENSE_COLLECTION)
+
+
+def search_qdrant(expanded_query, vector_mode, limit, filters=None):
+    collection_name, vector, using = qdrant_query(expanded_query, vector_mode)
     response = qdrant.query_points(
-        collection_name="problems_v2",
-        query=vec,
-        limit=100,
+        collection_name=collection_name,
+        query=vector,
+        using=using,
+        query_filter=qdrant_filter(filters),
+        search_params=qdrant_search_params(vector_mode),
+        limit=limit,
         with_payload={
-            "include": ["problem_name", "problem_link", "platform"]
+            "include": RESULT_FIELDS
         }
     )
+    return [format_result(point.payload) for point in response.points]
+
+
+def search_qdrant_many(expanded_queries, vector_mode, limit, filters=None):
+    query_filter = qdrant_filter(filters)
+    results = []
+    for start in range(0, len(expanded_queries), QDRANT_BATCH_SIZE):
+        collection_name = None
+        requests = []
+        for expanded_query in expanded_queries[start:start + QDRANT_BATCH_SIZE]:
+            collection_name, vector, using = qdrant_query(expanded_query, vector_mode)
+            requests.append(QueryRequest(
+                query=vector,
+                using=using,
+                filter=query_filter,
+                params=qdrant_search_params(vector_mode),
+                limit=limit,
+                with_payload={"include": RESULT_FIELDS},
+            ))
+        responses = qdrant.query_batch_points(collection_name=collection_name, requests=requests)
+        for response in responses:
+            results.append([format_result(point.payload) for point in response.points])
+    return results
+
+
+def search_local(expanded_query, limit, filters=None):
+    index = get_local_index()
+    indices, values = tfidf_sparse_vector(expanded_query)
+    return [format_result(index.payload(row)) for row, _ in index.search(indices, values, limit, filters)]
+
 
+def search_local_many(expanded_queries, limit, filters=None):
+    index = get_local_index()
     results = []
-    for point in response.points:
-        payload = point.payload or {}
-        results.append({
-            "problem_name": payload.get("problem_name", "N/A"),
-            "problem_link": payload.get("problem_link", "N/A"),
-            "platform": payload.get("platform", "N/A")
-        })
+    for start in range(0, len(expanded_queries), LOCAL_BATCH_SIZE):
+        vectors = [tfidf_sparse_vector(q) for q in expanded_queries[start:start + LOCAL_BATCH_SIZE]]
+        for hits in index.search_many(vectors, limit, filters):
+            results.append([format_result(index.payload(row)) for row, _ in hits])
+    return results
+
+
+def facet_counts(fields, filters, backend, vector_mode):
+    counts = {}
+    for field in fields:
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown facet: {field}")
+        # Each facet ignores its own filter so every option keeps its count.
+        others = {f: v for f, v in filters.items() if f != field}
+        if backend == "local":
+            counts[field] = get_local_index().facet_counts(field, others)
+        else:
+            response = qdrant.facet(
+                collection_name=qdrant_collection(vector_mode),
+                key=field,
+                facet_filter=qdrant_filter(others),
+                limit=FACET_LIMIT,
+            )
+            counts[field] = {hit.value: hit.count for hit in response.hits}
+    return counts
+
+
+def cache_key(expanded_query, backend, vector_mode, limit, filters):
+    # Keyed on the distinct expanded terms, so queries that expand to the
+    # same set ("bfs", "breadth first search") share an entry.
+    terms = " ".join(sorted(set(expanded_query.split())))
+    version = redis_cache.index_version() if redis_cache else None
+    filter_key = tuple((field, tuple(values)) for field, values in sorted(filters.items()))
+    return backend, vector_mode if backend == "qdrant" else None, version, limit, filter_key, terms
+
+
+def pack_results(results):
+    return json.dumps([[result[field] for field in RESULT_FIELDS] for result in results], separators=(",", ":"))
+
+
+def unpack_results(value):
+    return [dict(zip(RESULT_FIELDS, row)) for row in json.loads(value)]
+
+
+def pack_ranking(ranking):
+    return json.dumps(ranking, separators=(",", ":"))
+
+
+def cached_results(key, unpack=unpack_results):
+    results = result_cache.get(key)
+    if results is not None:
+        return results
+
+    if redis_cache is not None:
+        packed = redis_cache.get(key)
+        if packed is not None:
+            results = unpack(packed)
+            result_cache.put(key, results)
+            return results
+    return None
+
+
+def cache_results(key, results, pack=pack_results):
+    result_cache.put(key, results)
+    if redis_cache is not None:
+        redis_cache.put(key, pack(results))
+
+
+def search(query, vector_mode=None, backend=None, limit=SEARCH_LIMIT, filters=None):
+    expanded_query = expand_query(query)
+    backend = backend or SEARCH_BACKEND
+    vector_mode = vector_mode or VECTOR_MODE
+    filters = normalize_filters(filters)
+
+    key = cache_key(expanded_query, backend, vector_mode, limit, filters)
+    results = cached_results(key)
+    if results is not None:
+        return results
+
+    if backend == "local":
+        results = search_local(expanded_query, limit, filters)
+    elif backend == "qdrant":
+        results = search_qdrant(expanded_query, vector_mode, limit, filters)
+    else:
+        raise ValueError(f"Unknown search backend: {backend}")
+
+    cache_results(key, results)
+    return results
+
+
+def search_many(queries, limit=SEARCH_LIMIT, vector_mode=None, backend=None, filters=None):
+    backend = backend or SEARCH_BACKEND
+    vector_mode = vector_mode or VECTOR_MODE
+    filters = normalize_filters(filters)
+    if backend not in ("local", "qdrant"):
+        raise ValueError(f"Unknown search backend: {backend}")
+
+    results = [None] * len(queries)
+    missing = {}
+    expanded = {}
+    for position, query in enumerate(queries):
+        expanded_query = expand_query(query)
+        key = cache_key(expanded_query, backend, vector_mode, limit, filters)
+        cached = cached_results(key)
+        if cached is not None:
+            results[position] = cached
+        else:
+            missing.setdefault(key, []).append(position)
+            expanded[key] = expanded_query
+
+    if missing:
+        keys = list(missing)
+        expanded_queries = [expanded[key] for key in keys]
+        if backend == "local":
+            fetched = search_local_many(expanded_queries, limit, filters)
+        else:
+            fetched = search_qdrant_many(expanded_queries, vector_mode, limit, filters)
+        for key, hits in zip(keys, fetched):
+            cache_results(key, hits)
+            for position in missing[key]:
+                results[position] = hits
 
     return results
 
+
+def encode_cursor(digest, offset):
+    raw = json.dumps({"k": digest, "o": offset}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor, digest):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        offset = int(data["o"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if data.get("k") != digest or offset < 0:
+        raise ValueError("Cursor does not belong to this query")
+    return offset
+
+
+def rank_qdrant(expanded_query, vector_mode, depth, offset, limit, filters, score_threshold):
+    # One round trip returns the displayed page with payloads and the id/score
+    # ranking that later pages are served from.
+    collection_name, vector, using = qdrant_query(expanded_query, vector_mode)
+    query_filter = qdrant_filter(filters)
+    params = qdrant_search_params(vector_mode)
+    ranking_request = QueryRequest(query=vector, using=using, filter=query_filter, params=params, limit=depth,
+                                   score_threshold=score_threshold, with_payload=False)
+    page_request = QueryRequest(query=vector, using=using, filter=query_filter, params=params, limit=limit,
+                                offset=offset, score_threshold=score_threshold,
+                                with_payload={"include": RESULT_FIELDS})
+    ranking_response, page_response = qdrant.query_batch_points(
+        collection_name=collection_name, requests=[ranking_request, page_request]
+    )
+    ranking = [[point.id, point.score] for point in ranking_response.points]
+    page = [format_result(point.payload) for point in page_response.points]
+    return ranking, page
+
+
+def rank_local(expanded_query, depth, filters, score_threshold):
+    index = get_local_index()
+    indices, values = tfidf_sparse_vector(expanded_query)
+    hits = index.search(indices, values, depth, filters)
+    if score_threshold is not None:
+        hits = [(row, score) for row, score in hits if score >= score_threshold]
+    return [[row, score] for row, score in hits]
+
+
+def page_payloads(backend, vector_mode, handles):
+    if backend == "local":
+        index = get_local_index()
+        return [format_result(index.payload(row)) for row in handles]
+    records = qdrant.retrieve(
+        collection_name=qdrant_collection(vector_mode),
+        ids=handles,
+        with_payload={"include": RESULT_FIELDS},
+    )
+    by_id = {record.id: record.payload for record in records}
+    return [format_result(by_id.get(handle)) for handle in handles]
+
+
+def search_page(query, limit=PAGE_SIZE, offset=0, score_threshold=None, cursor=None, filters=None,
+                vector_mode=None, backend=None):
+    expanded_query = expand_query(query)
+    backend = backend or SEARCH_BACKEND
+    vector_mode = vector_mode or VECTOR_MODE
+    if backend not in ("local", "qdrant"):
+        raise ValueError(f"Unknown search backend: {backend}")
+    filters = normalize_filters(filters)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    score_threshold = float(score_threshold) if score_threshold is not None else None
+
+    ranking_key = ("paged_ranking", score_threshold) + cache_key(expanded_query, backend, vector_mode, None, filters)
+    digest = hashlib.sha1(json.dumps(ranking_key).encode("utf-8")).hexdigest()[:16]
+    offset = decode_cursor(cursor, digest) if cursor else max(0, int(offset))
+
+    # Cached as {"depth", "ranking"}: a ranking shorter than the depth it was
+    # asked for already holds every hit.
+    entry = cached_results(ranking_key, unpack=json.loads)
+    ranking = entry["ranking"] if entry is not None else None
+    complete = entry is not None and len(ranking) < entry["depth"]
+    if ranking is not None and (offset + limit <= len(ranking) or complete):
+        results = page_payloads(backend, vector_mode, [handle for handle, _ in ranking[offset:offset + limit]])
+    else:
+        if ranking is None and offset == 0:
+            depth = limit * (1 + PAGE_LOOKAHEAD)
+        else:
+            # Doubling keeps walking far past CURSOR_DEPTH from re-ranking
+            # on every page.
+            depth = max(CURSOR_DEPTH, offset + limit, 2 * len(ranking or ()))
+        if backend == "local":
+            ranking = rank_local(expanded_query, depth, filters, score_threshold)
+            results = page_payloads(backend, vector_mode, [handle for handle, _ in ranking[offset:offset + limit]])
+        else:
+            ranking, results = rank_qdrant(expanded_query, vector_mode, depth, offset, limit, filters,
+                                           score_threshold)
+        complete = len(ranking) < depth
+        cache_results(ranking_key, {"depth": depth, "ranking": ranking}, pack=pack_ranking)
+
+    next_offset = offset + len(results)
+    has_more = next_offset < len(ranking) or (not complete and len(results) == limit)
+    return {
+        "results": results,
+        "offset": offset,
+        "limit": limit,
+        "next_cursor": encode_cursor(digest, next_offset) if has_more and results else None,
+    }
+
+
+def invalidate_caches():
+    global vocabulary, local_index, lsa_projection, dense_search_params
+    try:
+        new_vocabulary = load_vocabulary()
+    except Exception as e:
+        new_vocabulary = None
+        print(f"Vocabulary reload failed, keeping the current one: {e}", file=sys.stderr)
+    # The local index and LSA projection are sized by the vocabulary, so all
+    # three change together; the other two reload lazily against the new one.
+    # A reindex may also have swapped problems_v2 to a different profile.
+    with index_lock:
+        if new_vocabulary is not None:
+            vocabulary = new_vocabulary
+        local_index = None
+        lsa_projection = None
+        dense_search_params = None
+        result_cache.invalidate()
+        if redis_cache is not None:
+            redis_cache.refresh_version()
+    print("Search caches invalidated", file=sys.stderr)
+
+
+def subscribe_invalidations():
+    try:
+        pubsub = r.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{CACHE_INVALIDATE_CHANNEL: lambda message: invalidate_caches()})
+        return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+    except Exception as e:
+        print(f"Cache invalidation subscription failed: {e}", file=sys.stderr)
+        return None
+
+
+def handle_request(data):
+    op = data.get("op", "search")
+    if op == "cache_stats":
+        stats = result_cache.stats()
+        if redis_cache is not None:
+            stats["redis"] = redis_cache.stats()
+        return stats
+    if op == "invalidate_cache":
+        invalidate_caches()
+        return result_cache.stats()
+
+    if op == "search_many":
+        return search_many(data.get("queries", []), limit=int(data.get("limit", SEARCH_LIMIT)),
+                           vector_mode=data.get("vector_mode"), backend=data.get("backend"),
+                           filters=data.get("filters"))
+
+    query = data.get("query", "")
+    if any(data.get(field) is not None for field in PAGING_FIELDS):
+        response = search_page(query, limit=data.get("limit") or PAGE_SIZE, offset=data.get("offset") or 0,
+                               score_threshold=data.get("score_threshold"), cursor=data.get("cursor"),
+                               filters=data.get("filters"), vector_mode=data.get("vector_mode"),
+                               backend=data.get("backend"))
+    else:
+        response = search(query, vector_mode=data.get("vector_mode"), backend=data.get("backend"),
+                          filters=data.get("filters"))
+    if not data.get("facets"):
+        return response
+    if not isinstance(response, dict):
+        response = {"results": response}
+    response["facets"] = facet_counts(data["facets"], normalize_filters(data.get("filters")),
+                                      data.get("backend") or SEARCH_BACKEND, data.get("vector_mode") or VECTOR_MODE)
+    return response
+
+def serve():
+    if SEARCH_BACKEND == "local":
+        get_local_index()
+    elif VECTOR_MODE == "dense":
+        get_dense_search_params()
+    subscribe_invalidations()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request_id = None
+        try:
+            data = json.loads(line)
+            request_id = data.get("id")
+            with index_lock:
+                results = handle_request(data)
+            response = {"id": request_id, "results": results}
+        except Exception as e:
+            response = {"id": request_id, "error": str(e)}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
 def main():
+    if "--serve" in sys.argv[1:]:
+        serve()
+        return
+
     raw_input = sys.stdin.read()
     try:
         data = json.loads(raw_input)
-        query = data.get("query", "")
-        results = search(query)
+        results = handle_request(data)
         print(json.dumps(results, indent=2))
     except Exception as e:
         print(json.dumps({"error": str(e)}), file=sys.stderr)
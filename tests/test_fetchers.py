@@ -0,0 +1,67 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FIXTURES = os.path.join(ROOT, "Fetcher", "fixtures")
+
+
+def load_fetcher(name):
+    pytest.importorskip("cloudscraper")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, "Fetcher", f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_codeforces_fixture_writes_problem_links(tmp_path, monkeypatch):
+    pytest.importorskip("bs4")
+    fetcher = load_fetcher("codeforces_problem_fetcher")
+    output = tmp_path / "codeforces.txt"
+    monkeypatch.setattr(sys, "argv", ["codeforces_problem_fetcher.py", "--output", str(output),
+                                      "--fixture", os.path.join(FIXTURES, "codeforces_problemset.html")])
+
+    fetcher.main()
+
+    # Only problem links inside the problems table: not tags, submit or
+    # status links, and not the one in the page menu.
+    assert output.read_text().splitlines() == [
+        "https://codeforces.com/problemset/problem/2049/D",
+        "https://codeforces.com/problemset/problem/2049/E",
+        "https://codeforces.com/problemset/problem/2050/F",
+        "https://codeforces.com/problemset/problem/2050/G",
+    ]
+
+
+def question_list(total, slugs):
+    return {"data": {"problemsetQuestionList": {
+        "total": total,
+        "questions": [{"titleSlug": slug, "paidOnly": False} for slug in slugs],
+    }}}
+
+
+def test_leetcode_failed_page_is_retried_then_skipped(monkeypatch):
+    fetcher = load_fetcher("leetcode_problem_fetcher")
+    monkeypatch.setattr(fetcher, "page_size", 1)
+    monkeypatch.setattr(fetcher.time, "sleep", lambda seconds: None)
+    calls = {}
+
+    def fetch_page(skip, limit=1):
+        calls[skip] = calls.get(skip, 0) + 1
+        if skip == 1 and calls[skip] == 1:
+            raise RuntimeError("HTTP 502")
+        if skip == 2:
+            raise RuntimeError("HTTP 500")
+        return question_list(4, [f"problem-{skip}"])
+
+    monkeypatch.setattr(fetcher, "fetch_page", fetch_page)
+
+    total, links, skipped = fetcher.get_problem_links(workers=2)
+
+    assert total == 4
+    assert sorted(links) == [fetcher.problem_url.format(slug=f"problem-{skip}") for skip in (0, 1, 3)]
+    assert skipped == [2]
+    assert calls[1] == 2
+    assert calls[2] == fetcher.page_attempts
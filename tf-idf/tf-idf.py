@@ -1,14 +1,32 @@
 import os
+import sys
+import json
+import hashlib
 import math
+import argparse
 import time
-import random
 import logging
+from array import array
 from collections import defaultdict
+import queue
+from multiprocessing import Process, Queue, shared_memory
+import numpy as np
+import redis
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct
+from qdrant_client.http.models import (
+    PointStruct, SparseVector, PointIdsList, VectorParams, Distance, PayloadSchemaType,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+)
 from dotenv import load_dotenv
 import psycopg2
+from psycopg2.extras import execute_values
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.vocab_snapshot import build_snapshot, VocabSnapshot, DictVocabulary
+from common.upsert_pipeline import UpsertPipeline
+from common.lsa import fit_projection, project, project_matrix
+from common.fingerprints import Fingerprint, ensure_table
+from common.redis_config import create_redis_client
 
 load_dotenv()
 
@@ -16,6 +34,42 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 BATCH_SIZE = 100
+SPARSE_VECTOR_NAME = "tfidf"
+VECTOR_MODES = ("dense", "sparse", "both")
+PAYLOAD_FIELDS = ("problem_name", "problem_link", "platform", "topics")
+LOCAL_INDEX_FIELDS = PAYLOAD_FIELDS
+# processor/pipeline.py writes the cleaned, augmented text to search_text;
+# rows it has not reached yet fall back to the statement.
+TEXT_COLUMN = "COALESCE(search_text, problem_statement)"
+PROBLEM_COLUMNS = ", ".join(("id", TEXT_COLUMN) + PAYLOAD_FIELDS)
+CACHE_INVALIDATE_CHANNEL = "search_cache_invalidate"
+INDEX_VERSION_KEY = "search_index_version"
+VOCAB_SNAPSHOT_KEY = "vocab_snapshot"
+IDF_TOLERANCE = 0.05
+# The watermark is a transaction start time, and a writer whose transaction
+# began before it can commit rows stamped earlier after the run has looked.
+# Each run re-reads this far behind the watermark; a row seen twice is just
+# re-vectorized to the same thing.
+WATERMARK_OVERLAP = float(os.getenv("tfidf_watermark_overlap", "600"))
+FINGERPRINT_STAGE = "tfidf"
+FINGERPRINT_COLUMNS = ("search_text", "problem_statement") + PAYLOAD_FIELDS
+LSA_PROJECTION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "query", "lsa_projection.npy")
+
+# State for incremental runs. problems.updated_at (kept current by the
+# trigger Database_Schema/migrate_problems.py installs) is the change watermark;
+# tfidf_terms keeps DF, the stable term id and the IDF the index was last
+# written with, and tfidf_doc_terms lets a changed doc take back its old DF.
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tfidf_state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tfidf_terms (
+    term TEXT PRIMARY KEY,
+    term_id INTEGER,
+    df INTEGER NOT NULL,
+    indexed_idf DOUBLE PRECISION
+);
+CREATE TABLE IF NOT EXISTS tfidf_doc_terms (problem_id INTEGER PRIMARY KEY, terms TEXT[] NOT NULL);
+CREATE INDEX IF NOT EXISTS tfidf_doc_terms_terms_idx ON tfidf_doc_terms USING GIN (terms);
+"""
 
 
 def connect_db():
@@ -27,25 +81,235 @@ def connect_db():
         dbname=os.getenv("dbname")
     )
 
-class TfIdfProcessor:
-    def __init__(self, qdrant_client: QdrantClient, collection_name: str):
-        self.qdrant_client = qdrant_client
-        self.collection_name = collection_name
-        self.final_collection_name = "problems_v2"
+def ensure_state_tables(conn, incremental=False):
+    # A full run only reads search_text; the incremental one also needs the
+    # updated_at watermark and the trigger that keeps it current.
+    needed = ("search_text", "updated_at") if incremental else ("search_text",)
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT count(*) FROM information_schema.columns "
+            "WHERE table_name = 'problems' AND column_name = ANY(%s)", (list(needed),)
+        )
+        ready = cur.fetchone()[0] == len(needed)
+        if ready and incremental:
+            cur.execute("SELECT count(*) FROM pg_trigger WHERE tgname = 'problems_touch_updated_at'")
+            ready = bool(cur.fetchone()[0])
+        if not ready:
+            raise RuntimeError(f"problems is missing {'/'.join(needed)}"
+                               + (" or the problems_touch_updated_at trigger" if incremental else "")
+                               + "; run Database_Schema/migrate_problems.py (it does not drop anything)")
+        cur.execute(STATE_SCHEMA)
+    conn.commit()
+    ensure_table(conn)
+
+
+def index_fingerprint(vector_mode):
+    # Content only: a shift in IDFs is tracked separately by the snapshot
+    # digest in tfidf_state, so it does not make every row look edited.
+    return Fingerprint(FINGERPRINT_STAGE, FINGERPRINT_COLUMNS, salt=vector_mode)
+
+
+def db_now(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT now()")
+        return cur.fetchone()[0]
+
+
+def load_state(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT key, value FROM tfidf_state")
+        return dict(cur.fetchall())
+
+
+def save_state(cur, **values):
+    execute_values(
+        cur,
+        "INSERT INTO tfidf_state (key, value) VALUES %s ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value",
+        [(key, str(value)) for key, value in values.items()],
+    )
 
+def problem_payload(row):
+    pid, _, *fields = row
+    payload = {"id": pid}
+    payload.update(zip(PAYLOAD_FIELDS, fields))
+    return payload
+
+
+def sparse_tf_idf(word_counts, vocabulary):
+    total_words = sum(word_counts.values())
+    weights = {}
+    for w, count in word_counts.items():
+        entry = vocabulary.lookup(w)
+        if entry is not None and total_words > 0:
+            tf = count / total_words
+            weight = tf * entry[1]
+            if weight:
+                weights[entry[0]] = weight
+
+    indices = sorted(weights)
+    norm = math.sqrt(sum(x*x for x in weights.values()))
+    values = [weights[i] / norm for i in indices] if norm > 0 else []
+    return indices, values
+
+
+def vectorize_batch(batch, vocabulary=None):
+    vocabulary = vocabulary or worker_vocabulary
+    vectors = []
+    for pid, text in batch:
+        wc = defaultdict(int)
+        for w in text.split():
+            wc[w] += 1
+        indices, values = sparse_tf_idf(wc, vocabulary)
+        vectors.append((pid, indices, values))
+    return vectors
+
+
+def densify(indices, values, size):
+    vec = [0.0] * size
+    for i, v in zip(indices, values):
+        if i < size:
+            vec[i] = v
+    return vec
+
+
+def build_points(vectors, payloads, vector_mode, dense_size, only=None, projection=None):
+    # Every field is already well-typed, so model_construct skips pydantic
+    # validation, which was most of the per-point cost.
+    points = {"dense": [], "sparse": [], "lsa": []}
+    for pid, indices, values in vectors:
+        if only is not None and pid not in only:
+            continue
+        payload = payloads[pid]
+        if vector_mode in ("dense", "both"):
+            vector = densify(indices, values, dense_size)
+            points["dense"].append(PointStruct.model_construct(id=int(pid), vector=vector, payload=payload))
+        if vector_mode in ("sparse", "both"):
+            vector = {SPARSE_VECTOR_NAME: SparseVector(indices=indices, values=values)}
+            points["sparse"].append(PointStruct.model_construct(id=int(pid), vector=vector, payload=payload))
+        if projection is not None:
+            vector = project(indices, values, projection).tolist()
+            points["lsa"].append(PointStruct.model_construct(id=int(pid), vector=vector, payload=payload))
+    return points
+
+
+def submit_points(pipeline, points, collections):
+    for kind, points_to_upsert in points.items():
+        for i in range(0, len(points_to_upsert), BATCH_SIZE):
+            pipeline.submit(collections[kind], points_to_upsert[i:i + BATCH_SIZE])
+
+
+worker_shm = None
+worker_vocabulary = None
+
+
+def init_worker(shm_name):
+    # Workers read the vocab/IDF snapshot straight out of the parent's shared
+    # memory block instead of receiving a pickled copy with every task.
+    global worker_shm, worker_vocabulary
+    worker_shm = shared_memory.SharedMemory(name=shm_name)
+    worker_vocabulary = VocabSnapshot(worker_shm.buf, term_index=True)
+
+
+def upsert_worker(shm_name, tasks, results, options):
+    # A vector pass worker vectorizes, densifies, builds and upserts its own
+    # points through its own client and in-flight window, so no per-point
+    # work funnels through the parent. Only the sparse vectors go back, for
+    # the local index and the LSA fit. The last message is the ids whose
+    # batches gave up, or the error that stopped the worker.
+    try:
+        init_worker(shm_name)
+        client = options["qdrant_factory"]()
+        with UpsertPipeline(client, in_flight=options["upsert_concurrency"]) as pipeline:
+            for seq, batch, payloads, only in iter(tasks.get, None):
+                vectors = vectorize_batch(batch)
+                points = build_points(vectors, payloads, options["vector_mode"], options["dense_size"], only)
+                submit_points(pipeline, points, options["collections"])
+                results.put((seq, vectors))
+        results.put((None, set(pipeline.failed_ids)))
+    except Exception as e:
+        results.put((None, RuntimeError(f"vector pass worker failed: {e!r}")))
+
+
+class LocalIndexBuilder:
+    def __init__(self, vocab_size):
+        self.vocab_size = vocab_size
+        self.ids = array("q")
+        self.indptr = array("q", [0])
+        self.indices = array("i")
+        self.data = array("f")
+        self.payloads = []
+
+    def add(self, pid, indices, values, payload):
+        self.ids.append(int(pid))
+        self.indices.extend(indices)
+        self.data.extend(values)
+        self.indptr.append(len(self.indices))
+        self.payloads.append({field: payload[field] for field in LOCAL_INDEX_FIELDS if field in payload})
+
+    def save(self, path):
+        payloads = json.dumps(self.payloads).encode("utf-8")
+        np.savez(
+            path,
+            ids=np.frombuffer(self.ids, dtype=np.int64),
+            indptr=np.frombuffer(self.indptr, dtype=np.int64),
+            indices=np.frombuffer(self.indices, dtype=np.int32),
+            data=np.frombuffer(self.data, dtype=np.float32),
+            shape=np.array([len(self.ids), self.vocab_size], dtype=np.int64),
+            payloads=np.frombuffer(payloads, dtype=np.uint8),
+        )
+        logger.info(f"Saved local index with {len(self.ids)} docs and {len(self.data)} non-zeros to {path}")
+
+    def matrix(self):
+        from scipy import sparse
+        return sparse.csr_matrix(
+            (np.frombuffer(self.data, dtype=np.float32), np.frombuffer(self.indices, dtype=np.int32),
+             np.frombuffer(self.indptr, dtype=np.int64)),
+            shape=(len(self.ids), self.vocab_size),
+        )
 
 
-    def fetch_batches(self, batch_size=BATCH_SIZE):
+class TfIdfProcessor:
+    def __init__(self, qdrant_client: QdrantClient, vector_mode: str = "dense",
+                 local_index_path: str = None, redis_client: redis.Redis = None,
+                 vocab_snapshot_path: str = None, workers: int = 1, upsert_concurrency: int = 4,
+                 min_df: int = 1, max_df: float = 1.0, max_vocab: int = 0,
+                 lsa_dim: int = 0, lsa_projection_path: str = LSA_PROJECTION_PATH,
+                 qdrant_factory=None):
+        if vector_mode not in VECTOR_MODES:
+            raise ValueError(f"Unknown vector mode: {vector_mode}")
+        self.qdrant_client = qdrant_client
+        # Vector pass workers each open their own client with this.
+        self.qdrant_factory = qdrant_factory or create_qdrant_client
+        self.final_collection_name = "problems_v2"
+        self.sparse_collection_name = "problems_sparse"
+        self.lsa_collection_name = "problems_lsa"
+        self.vector_mode = vector_mode
+        self.local_index_path = local_index_path
+        self.redis_client = redis_client
+        self.vocab_snapshot_path = vocab_snapshot_path
+        self.workers = max(1, workers)
+        self.upsert_concurrency = upsert_concurrency
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_vocab = max_vocab
+        self.lsa_dim = lsa_dim
+        self.lsa_projection_path = lsa_projection_path
+
+    def fetch_batches(self, batch_size=BATCH_SIZE, with_payload=False):
+        # The payload columns ride along in the same cursor, so the vector pass
+        # needs no extra round trip to look them up.
         conn = connect_db()
         cur = conn.cursor(name="streaming_cursor")
         try:
-            cur.execute("SELECT id, problem_statement FROM problems")
+            cur.execute(f"SELECT {PROBLEM_COLUMNS if with_payload else 'id, ' + TEXT_COLUMN} FROM problems")
             while True:
                 rows = cur.fetchmany(batch_size)
                 if not rows:
                     break
-                batch = [(pid, stmt.strip()) for pid, stmt in rows if stmt and stmt.strip()]
-                yield batch
+                rows = [row for row in rows if row[1] and row[1].strip()]
+                batch = [(row[0], row[1].strip()) for row in rows]
+                payloads = {row[0]: problem_payload(row) for row in rows} if with_payload else {}
+                yield batch, payloads
         finally:
             cur.close()
             conn.close()
@@ -53,104 +317,551 @@ class TfIdfProcessor:
     def build_vocab_and_doc_freq(self):
         doc_freq = defaultdict(int)
         total_docs = 0
-        vocab = set()
+        doc_terms = []
 
         logger.info("Starting first pass: building vocabulary and document frequencies")
-        for batch in self.fetch_batches():
-            for _, text in batch:
+        for batch, _ in self.fetch_batches():
+            for pid, text in batch:
                 total_docs += 1
-                words = text.split()
-                seen = set()
-                for w in words:
-                    if w not in seen:
-                        doc_freq[w] += 1
-                        seen.add(w)
-                vocab.update(words)
-
-        vocab_list = sorted(vocab)
-        logger.info(f"Completed first pass: total docs={total_docs}, vocab size={len(vocab_list)}")
-        return total_docs, doc_freq, vocab_list
+                seen = set(text.split())
+                for w in seen:
+                    doc_freq[w] += 1
+                doc_terms.append((int(pid), sorted(seen)))
 
-    def fetch_existing_payloads(self, ids):
-        existing_payloads = {}
-        logger.info(f"Fetching existing payloads for {len(ids)} points")
-        for i in range(0, len(ids), BATCH_SIZE):
-            batch_ids = ids[i:i + BATCH_SIZE]
-            try:
-                points = self.qdrant_client.retrieve(
-                    collection_name=self.collection_name,
-                    ids=batch_ids,
-                    with_payload=True,
-                )
-                for p in points:
-                    existing_payloads[p.id] = p.payload or {}
-            except Exception as e:
-                logger.error(f"Error retrieving payload batch {batch_ids}: {e}")
-        return existing_payloads
+        vocab_list = self.prune_vocab(total_docs, doc_freq)
+        logger.info(f"Completed first pass: total docs={total_docs}, vocab size={len(vocab_list)}")
+        return total_docs, doc_freq, vocab_list, doc_terms
+
+    def term_allowed(self, df, total_docs):
+        return df >= self.min_df and df <= self.max_df * total_docs
+
+    def prune_vocab(self, total_docs, doc_freq):
+        kept = [w for w, df in doc_freq.items() if self.term_allowed(df, total_docs)]
+        if self.max_vocab and len(kept) > self.max_vocab:
+            kept.sort(key=lambda w: (-doc_freq[w], w))
+            kept = kept[:self.max_vocab]
+        vocab_list = sorted(kept)
+
+        dropped = len(doc_freq) - len(vocab_list)
+        if dropped:
+            kept_set = set(vocab_list)
+            postings = sum(doc_freq.values())
+            kept_postings = sum(doc_freq[w] for w in kept_set)
+            logger.info(
+                f"Pruned {dropped} of {len(doc_freq)} terms (min_df={self.min_df}, max_df={self.max_df}, "
+                f"max_vocab={self.max_vocab or 'none'}): dense vectors {len(doc_freq) * 4 / 1024:.1f} -> "
+                f"{len(vocab_list) * 4 / 1024:.1f} KiB per point, "
+                f"{total_docs * len(doc_freq) * 4 / 2 ** 20:.1f} -> {total_docs * len(vocab_list) * 4 / 2 ** 20:.1f} MiB "
+                f"for {total_docs} docs; sparse non-zeros {postings} -> {kept_postings}"
+            )
+        return vocab_list
 
     def compute_idf(self, total_docs, doc_freq):
         idf = {w: 1 + math.log(total_docs / freq) for w, freq in doc_freq.items()}
         return idf
 
-    def compute_tf_idf_vector(self, word_counts, idf, word2idx):
-        total_words = sum(word_counts.values())
-        vec = [0.0] * len(word2idx)
-        for w, count in word_counts.items():
-            idx = word2idx.get(w)
-            if idx is not None and total_words > 0:
-                tf = count / total_words
-                vec[idx] = tf * idf.get(w, 0.0)
-
-        norm = math.sqrt(sum(x*x for x in vec))
-        if norm > 0:
-            vec = [x / norm for x in vec]
-        return vec
-
-    def retry_upsert(self, points, max_retries=5, base_delay=2.0):
-        attempt = 0
-        while attempt <= max_retries:
-            try:
-                self.qdrant_client.upsert(collection_name=self.final_collection_name, points=points)
-                return
-            except Exception as e:
-                wait = base_delay * (2 ** attempt) + random.uniform(0, 0.1)
-                logger.warning(f"Upsert failed (attempt {attempt}): {e}, retrying in {wait:.2f}s")
-                time.sleep(wait)
-                attempt += 1
-        logger.error(f"Failed to upsert points after {max_retries} retries.")
+    def compute_sparse_tf_idf_vector(self, word_counts, idf, word2idx):
+        return sparse_tf_idf(word_counts, DictVocabulary(word2idx, idf))
 
-    def process_and_upsert(self):
-        total_docs, doc_freq, vocab_list = self.build_vocab_and_doc_freq()
+    def densify(self, indices, values, size):
+        return densify(indices, values, size)
 
-        word2idx = {w: i for i, w in enumerate(vocab_list)}
-        idf = self.compute_idf(total_docs, doc_freq)
-
-        logger.info("Starting second pass: compute TF-IDF vectors and upsert to Qdrant")
+    def compute_tf_idf_vector(self, word_counts, idf, word2idx):
+        indices, values = self.compute_sparse_tf_idf_vector(word_counts, idf, word2idx)
+        return self.densify(indices, values, len(word2idx))
+
+    def collections(self, dense_collection=None):
+        return {"dense": dense_collection or self.final_collection_name, "sparse": self.sparse_collection_name,
+                "lsa": self.lsa_collection_name}
+
+    def vector_pass(self, snapshot, dense_size, consume, only=None, dense_collection=None):
+        # Both paths weight with the snapshot's float32 IDFs, the same ones
+        # query.py uses, so the worker count never changes a stored vector.
+        # consume(vectors, payloads) sees every batch in input order; the
+        # return value is the ids whose points failed to upsert.
+        collections = self.collections(dense_collection)
+        if self.workers == 1:
+            vocabulary = VocabSnapshot(snapshot, term_index=True)
+            with UpsertPipeline(self.qdrant_client, in_flight=self.upsert_concurrency) as pipeline:
+                for batch, payloads in self.fetch_batches(with_payload=True):
+                    vectors = vectorize_batch(batch, vocabulary)
+                    submit_points(pipeline, build_points(vectors, payloads, self.vector_mode, dense_size, only),
+                                  collections)
+                    consume(vectors, payloads)
+            return set(pipeline.failed_ids)
+
+        options = {"qdrant_factory": self.qdrant_factory, "upsert_concurrency": self.upsert_concurrency,
+                   "vector_mode": self.vector_mode, "dense_size": dense_size, "collections": collections}
+        tasks = Queue()
+        results = Queue()
+        shm = shared_memory.SharedMemory(create=True, size=len(snapshot))
+        processes = []
+        try:
+            shm.buf[:len(snapshot)] = snapshot
+            processes = [Process(target=upsert_worker, args=(shm.name, tasks, results, options), daemon=True)
+                         for _ in range(self.workers)]
+            for process in processes:
+                process.start()
+
+            pending = {}
+            done = {}
+            failed = set()
+            finished = 0
+            next_seq = 0
+
+            def receive():
+                nonlocal finished, next_seq
+                while True:
+                    try:
+                        seq, value = results.get(timeout=5)
+                        break
+                    except queue.Empty:
+                        if any(process.exitcode not in (None, 0) for process in processes):
+                            raise RuntimeError("a vector pass worker died")
+                if seq is None:
+                    if isinstance(value, Exception):
+                        raise value
+                    failed.update(value)
+                    finished += 1
+                else:
+                    done[seq] = value
+                while next_seq in done:
+                    consume(done.pop(next_seq), pending.pop(next_seq))
+                    next_seq += 1
+
+            for seq, (batch, payloads) in enumerate(self.fetch_batches(with_payload=True)):
+                pending[seq] = payloads
+                batch_only = None if only is None else {pid for pid, _ in batch if pid in only}
+                tasks.put((seq, batch, payloads, batch_only))
+                # A bounded window of batches keeps memory flat.
+                while len(pending) > 2 * self.workers:
+                    receive()
+            for _ in processes:
+                tasks.put(None)
+            while finished < len(processes):
+                receive()
+            return failed
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            shm.close()
+            shm.unlink()
+
+    def upsert_vectors(self, pipeline, vectors, payloads, dense_size, local_index=None, projection=None,
+                       only=None, dense_collection=None):
+        if local_index is not None:
+            for pid, indices, values in vectors:
+                local_index.add(pid, indices, values, payloads[pid])
+        points = build_points(vectors, payloads, self.vector_mode, dense_size, only, projection)
+        submit_points(pipeline, points, self.collections(dense_collection))
+
+    def index_settings(self):
+        return {"vector_mode": self.vector_mode, "min_df": self.min_df, "max_df": self.max_df,
+                "max_vocab": self.max_vocab, "lsa_dim": self.lsa_dim}
+
+    def restore_settings(self, state):
+        # An incremental run updates the collections the last full rebuild
+        # wrote, with its cutoffs, whatever flags it was started with.
+        settings = {"vector_mode": state.get("vector_mode", self.vector_mode),
+                    "min_df": int(state.get("min_df", self.min_df)),
+                    "max_df": float(state.get("max_df", self.max_df)),
+                    "max_vocab": int(state.get("max_vocab", self.max_vocab)),
+                    "lsa_dim": int(state.get("lsa_dim", self.lsa_dim))}
+        overridden = {key: value for key, value in settings.items() if getattr(self, key) != value}
+        if overridden:
+            logger.warning("Using the last full rebuild's settings instead of the flags given: "
+                           + ", ".join(f"{key}={value}" for key, value in overridden.items()))
+        for key, value in settings.items():
+            setattr(self, key, value)
+
+    def outputs_exist(self):
+        return ((not self.local_index_path or os.path.exists(self.local_index_path))
+                and (not self.lsa_dim or os.path.exists(self.lsa_projection_path)))
+
+    def process_and_upsert(self, force=False):
+        fingerprint = index_fingerprint(self.vector_mode)
+        conn = connect_db()
+        try:
+            ensure_state_tables(conn)
+            watermark = db_now(conn)
+            state = load_state(conn)
+            # Read before pass 1, so a row edited mid-run is picked up again
+            # next time.
+            with conn.cursor() as cur:
+                changed = fingerprint.changed_fingerprints(cur)
+                removed = fingerprint.orphaned(cur)
+        finally:
+            conn.close()
 
-        for batch in self.fetch_batches():
-            batch_ids = []
-            batch_word_counts = []
+        settings_match = all(state.get(key) == str(value) for key, value in self.index_settings().items())
+        if (not force and not changed and not removed and "vocab_digest" in state and settings_match
+                and self.outputs_exist()):
+            logger.info("No problem changed since the last full run; skipping the rebuild")
+            return
 
-            for pid, text in batch:
-                words = text.split()
-                wc = defaultdict(int)
-                for w in words:
-                    wc[w] += 1
-                batch_ids.append(pid)
-                batch_word_counts.append((pid, wc))
+        total_docs, doc_freq, vocab_list, doc_terms = self.build_vocab_and_doc_freq()
 
-            existing_payloads = self.fetch_existing_payloads(batch_ids)
+        word2idx = {w: i for i, w in enumerate(vocab_list)}
+        idf = self.compute_idf(total_docs, {w: doc_freq[w] for w in vocab_list})
+        snapshot = build_snapshot(((w, i, idf[w]) for w, i in word2idx.items()))
+        dense_collection, replaced = self.final_collection_name, None
+        if self.vector_mode in ("dense", "both"):
+            dense_collection, replaced = self.ensure_dense_dimension(self.final_collection_name, len(word2idx))
+            force = force or dense_collection != self.final_collection_name
+
+        # Unchanged rows keep their points unless the weights moved under them.
+        vocab_digest = hashlib.sha1(snapshot).hexdigest()
+        reweighted = vocab_digest != state.get("vocab_digest")
+        only = None if force or reweighted else changed
+        logger.info(f"{len(changed)} of {total_docs} docs changed since the last full run"
+                    + ("; the vocabulary or IDFs changed, so upserting all of them" if reweighted and not force
+                       else "; upserting all of them anyway" if force else ""))
+        if removed:
+            self.delete_points(removed)
 
-            points_to_upsert = []
-            for pid, wc in batch_word_counts:
-                vector = self.compute_tf_idf_vector(wc, idf, word2idx)
-                payload = existing_payloads.get(pid, {})
-                points_to_upsert.append(PointStruct(id=int(pid), vector=vector, payload=payload))
+        logger.info("Starting second pass: compute TF-IDF vectors and upsert to Qdrant")
+        # The LSA fit needs the whole doc-term matrix, which the local index
+        # builder already collects.
+        need_matrix = self.local_index_path or self.lsa_dim
+        local_index = LocalIndexBuilder(len(word2idx)) if need_matrix else None
+
+        started = time.monotonic()
+        processed = 0
+
+        def consume(vectors, payloads):
+            nonlocal processed
+            if local_index is not None:
+                for pid, indices, values in vectors:
+                    local_index.add(pid, indices, values, payloads[pid])
+            processed += len(vectors)
+            elapsed = time.monotonic() - started
+            logger.info(f"Vectorized {processed} docs ({processed / elapsed:.1f} docs/s, {self.workers} workers)")
+
+        failed = self.vector_pass(snapshot, len(word2idx), consume, only=only, dense_collection=dense_collection)
+        self.publish_collection(self.final_collection_name, dense_collection, replaced)
+
+        if self.local_index_path:
+            local_index.save(self.local_index_path)
+        if self.lsa_dim:
+            failed |= self.fit_lsa(local_index)
+
+        self.save_full_state(total_docs, doc_freq, word2idx, idf, doc_terms, watermark, fingerprint, changed, failed,
+                             removed, vocab_digest)
+        self.publish_vocab_snapshot(snapshot)
+        self.notify_reindex()
+
+    def fit_lsa(self, local_index):
+        matrix = local_index.matrix()
+        started = time.monotonic()
+        projection, singular_values = fit_projection(matrix, self.lsa_dim)
+        explained = float(np.sum(singular_values ** 2) / matrix.multiply(matrix).sum())
+        logger.info(f"Fitted {projection.shape[1]}-dim LSA projection in {time.monotonic() - started:.1f}s "
+                    f"({explained:.1%} of the squared norm retained)")
+        collection_name, replaced = self.ensure_dense_dimension(self.lsa_collection_name, projection.shape[1])
+        embeddings = project_matrix(matrix, projection)
+        with UpsertPipeline(self.qdrant_client, in_flight=self.upsert_concurrency) as pipeline:
+            for start in range(0, len(local_index.ids), BATCH_SIZE):
+                pipeline.submit(collection_name, [
+                    PointStruct(id=int(pid), vector=embeddings[row].tolist(),
+                                payload={"id": int(pid), **local_index.payloads[row]})
+                    for row, pid in enumerate(local_index.ids[start:start + BATCH_SIZE], start)
+                ])
+        self.publish_collection(self.lsa_collection_name, collection_name, replaced)
+        np.save(self.lsa_projection_path, projection)
+        logger.info(f"Saved LSA projection to {self.lsa_projection_path}")
+        return set(pipeline.failed_ids)
+
+    def load_lsa_projection(self):
+        if not self.lsa_dim:
+            return None
+        if not os.path.exists(self.lsa_projection_path):
+            logger.warning(f"No LSA projection at {self.lsa_projection_path}; run a full rebuild with --lsa-dim")
+            return None
+        return np.load(self.lsa_projection_path, mmap_mode="r")
+
+    def aliased_collection(self, name):
+        for alias in self.qdrant_client.get_aliases().aliases:
+            if alias.alias_name == name:
+                return alias.collection_name
+        return None
+
+    def ensure_dense_dimension(self, name, size):
+        # Returns the collection to write into and the one it replaces. A
+        # resize builds a new collection behind the name's back; the name
+        # keeps serving the old one until publish_collection swaps the alias.
+        current = self.aliased_collection(name)
+        if current is None and self.qdrant_client.collection_exists(name):
+            current = name
+        on_disk = None
+        quantization = None
+        if current is not None:
+            config = self.qdrant_client.get_collection(current).config
+            vectors = config.params.vectors
+            if vectors.size == size:
+                return name, None
+            logger.warning(f"{name} has {vectors.size} dimensions but needs {size}; building a new collection")
+            # Keep the storage profile (quantization, on-disk originals) it was created with.
+            on_disk = vectors.on_disk
+            quantization = config.quantization_config
+        target = f"{name}_{size}_{int(time.time())}"
+        self.qdrant_client.create_collection(
+            collection_name=target,
+            vectors_config=VectorParams(size=size, distance=Distance.COSINE, on_disk=on_disk),
+            quantization_config=quantization,
+        )
+        for field_name in ("platform", "topics"):
+            self.qdrant_client.create_payload_index(
+                collection_name=target,
+                field_name=field_name,
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
+        return target, current
+
+    def publish_collection(self, name, target, previous):
+        if target == name:
+            return
+        operations = []
+        if previous == name:
+            # A plain collection still holds the name (from before aliases
+            # were used); it has to go before the alias can take it.
+            self.qdrant_client.delete_collection(name)
+        elif previous is not None:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=name)))
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=name)))
+        self.qdrant_client.update_collection_aliases(change_aliases_operations=operations)
+        logger.info(f"{name} now points at {target}")
+        if previous not in (None, name):
+            self.qdrant_client.delete_collection(previous)
+
+    def save_full_state(self, total_docs, doc_freq, word2idx, idf, doc_terms, watermark, fingerprint, changed,
+                        failed=(), removed=(), vocab_digest=""):
+        # Pruned terms keep their DF (with no id) so later incremental runs can
+        # admit them once they pass the cutoffs.
+        conn = connect_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE tfidf_terms, tfidf_doc_terms")
+                execute_values(
+                    cur, "INSERT INTO tfidf_terms (term, term_id, df, indexed_idf) VALUES %s",
+                    ((w, word2idx.get(w), df, idf.get(w)) for w, df in doc_freq.items()), page_size=1000,
+                )
+                execute_values(cur, "INSERT INTO tfidf_doc_terms (problem_id, terms) VALUES %s",
+                               doc_terms, page_size=1000)
+                save_state(cur, doc_count=total_docs, dense_dimension=len(word2idx), watermark=watermark,
+                           vocab_digest=vocab_digest, **self.index_settings())
+                # The fingerprints read before the vector pass, so a row edited
+                # mid-run is picked up again next time. Points that never got
+                # written lose theirs, so the next run pushes them again.
+                fingerprint.store(cur, [(pid, value) for pid, value in changed.items() if pid not in failed])
+                if failed or removed:
+                    fingerprint.forget(cur, list(failed) + list(removed))
+            conn.commit()
+            if failed:
+                logger.error(f"{len(failed)} points failed to upsert; the next run will retry them")
+            logger.info(f"Saved incremental state: {total_docs} docs, {len(word2idx)} terms, watermark {watermark}")
+        finally:
+            conn.close()
 
-            for i in range(0, len(points_to_upsert), BATCH_SIZE):
-                chunk = points_to_upsert[i:i + BATCH_SIZE]
-                self.retry_upsert(chunk)
-                logger.info(f"Upserted batch of {len(chunk)} vectors")
+    def process_incremental(self, idf_tolerance=IDF_TOLERANCE):
+        conn = connect_db()
+        try:
+            ensure_state_tables(conn, incremental=True)
+            state = load_state(conn)
+            if "watermark" in state:
+                self.reindex_changed(conn, state, idf_tolerance)
+                return
+        finally:
+            conn.close()
+        logger.info("No incremental state found; running a full rebuild")
+        self.process_and_upsert()
+
+    def reindex_changed(self, conn, state, idf_tolerance):
+        self.restore_settings(state)
+        watermark = db_now(conn)
+        changed = {}
+        payloads = {}
+        with conn.cursor(name="changed_cursor") as cur:
+            cur.execute(f"SELECT {PROBLEM_COLUMNS} FROM problems "
+                        "WHERE updated_at > %s::timestamptz - %s * interval '1 second'",
+                        (state["watermark"], WATERMARK_OVERLAP))
+            for row in cur:
+                changed[row[0]] = (row[1] or "").strip()
+                payloads[row[0]] = problem_payload(row)
+        if not changed:
+            logger.info(f"No problems changed since {state['watermark']}")
+            with conn.cursor() as cur:
+                save_state(cur, watermark=watermark)
+            conn.commit()
+            return
+        logger.info(f"{len(changed)} problems changed since {state['watermark']} "
+                    f"(re-reading {WATERMARK_OVERLAP:.0f}s behind it)")
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT term, term_id, df, indexed_idf FROM tfidf_terms")
+            terms = {term: [term_id, df, indexed_idf] for term, term_id, df, indexed_idf in cur}
+            cur.execute("SELECT problem_id, terms FROM tfidf_doc_terms WHERE problem_id = ANY(%s)", (list(changed),))
+            previous_terms = dict(cur.fetchall())
+
+        total_docs = int(state["doc_count"])
+        dense_size = int(state["dense_dimension"])
+        ids = [entry[0] for entry in terms.values() if entry[0] is not None]
+        next_id = max(ids, default=-1) + 1
+        vocab_size = len(ids)
+        touched = set()
+        new_doc_terms = {}
+        for pid, text in changed.items():
+            previous = previous_terms.get(pid)
+            if previous is not None:
+                total_docs -= 1
+                for w in previous:
+                    terms[w][1] -= 1
+                touched.update(previous)
+            if not text:
+                continue
+            total_docs += 1
+            current = set(text.split())
+            for w in current:
+                entry = terms.get(w)
+                if entry is None:
+                    entry = terms[w] = [None, 0, None]
+                entry[1] += 1
+            touched.update(current)
+            new_doc_terms[pid] = sorted(current)
+
+        for w in sorted(touched):
+            entry = terms[w]
+            if entry[0] is None and self.term_allowed(entry[1], total_docs):
+                if self.max_vocab and vocab_size >= self.max_vocab:
+                    break
+                # New terms get the next free id so existing vectors stay valid.
+                entry[0] = next_id
+                next_id += 1
+                vocab_size += 1
+
+        idf = {w: 1 + math.log(total_docs / df) for w, (term_id, df, _) in terms.items()
+               if term_id is not None and df > 0}
+        moved = [w for w, value in idf.items()
+                 if terms[w][2] is None or abs(value - terms[w][2]) > idf_tolerance * terms[w][2]]
+
+        affected = {}
+        with conn.cursor() as cur:
+            if moved:
+                cur.execute(
+                    f"SELECT {PROBLEM_COLUMNS} FROM problems "
+                    "WHERE id IN (SELECT problem_id FROM tfidf_doc_terms WHERE terms && %s::text[]) "
+                    "AND NOT (id = ANY(%s))",
+                    (moved, list(changed)),
+                )
+                for row in cur:
+                    if row[1] and row[1].strip():
+                        affected[row[0]] = row[1].strip()
+                        payloads[row[0]] = problem_payload(row)
+        logger.info(f"IDF moved beyond {idf_tolerance:.0%} for {len(moved)} terms; "
+                    f"re-vectorizing {len(new_doc_terms)} changed and {len(affected)} affected docs")
+
+        word2idx = {w: entry[0] for w, entry in terms.items() if w in idf}
+        snapshot = build_snapshot(((w, i, idf[w]) for w, i in word2idx.items()), dense_size)
+        vocabulary = VocabSnapshot(snapshot, term_index=True)
+        if self.vector_mode in ("dense", "both") and next_id > dense_size:
+            logger.warning(f"{next_id - dense_size} terms are past the dense collection's {dense_size} dimensions "
+                           "and only reach sparse vectors until the next full rebuild")
+        if self.local_index_path:
+            logger.warning("The local index is only rebuilt by a full run; skipping it")
+
+        # Changed docs are folded into the existing LSA space; the projection
+        # itself is only refitted by a full rebuild.
+        projection = self.load_lsa_projection()
+        docs = [(pid, text) for pid, text in changed.items() if text] + list(affected.items())
+        with UpsertPipeline(self.qdrant_client, in_flight=self.upsert_concurrency) as pipeline:
+            for i in range(0, len(docs), BATCH_SIZE):
+                vectors = vectorize_batch(docs[i:i + BATCH_SIZE], vocabulary)
+                self.upsert_vectors(pipeline, vectors, payloads, dense_size, projection=projection)
+
+        removed = [pid for pid, text in changed.items() if not text and pid in previous_terms]
+        if removed:
+            self.delete_points(removed)
+
+        fingerprint = index_fingerprint(self.vector_mode)
+        if pipeline.failed_ids:
+            # Keep the old watermark and term state: the next run picks up
+            # the same changed rows and redoes the DF bookkeeping from scratch.
+            with conn.cursor() as cur:
+                fingerprint.forget(cur, [pid for pid, _ in docs])
+            conn.commit()
+            logger.error(f"{len(pipeline.failed_ids)} points failed to upsert; watermark stays at "
+                         f"{state['watermark']} so the next run retries them")
+            return
+
+        for w in moved:
+            terms[w][2] = idf[w]
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                "INSERT INTO tfidf_terms (term, term_id, df, indexed_idf) VALUES %s "
+                "ON CONFLICT (term) DO UPDATE SET df = EXCLUDED.df, indexed_idf = EXCLUDED.indexed_idf",
+                [(w, terms[w][0], terms[w][1], terms[w][2]) for w in touched.union(moved)],
+                page_size=1000,
+            )
+            if removed:
+                cur.execute("DELETE FROM tfidf_doc_terms WHERE problem_id = ANY(%s)", (removed,))
+            # These points now hold vectors from a different vocabulary than
+            # the last full run's, so the next one must rewrite them.
+            fingerprint.forget(cur, [pid for pid, _ in docs] + removed)
+            execute_values(
+                cur,
+                "INSERT INTO tfidf_doc_terms (problem_id, terms) VALUES %s "
+                "ON CONFLICT (problem_id) DO UPDATE SET terms = EXCLUDED.terms",
+                list(new_doc_terms.items()),
+                page_size=1000,
+            )
+            save_state(cur, doc_count=total_docs, watermark=watermark)
+        conn.commit()
+        logger.info(f"Incremental reindex done: {total_docs} docs, {len(word2idx)} terms, watermark {watermark}")
+
+        self.publish_vocab_snapshot(snapshot)
+        self.notify_reindex()
+
+    def delete_points(self, ids):
+        collections = []
+        if self.vector_mode in ("dense", "both"):
+            collections.append(self.final_collection_name)
+        if self.vector_mode in ("sparse", "both"):
+            collections.append(self.sparse_collection_name)
+        if self.lsa_dim:
+            collections.append(self.lsa_collection_name)
+        for collection_name in collections:
+            try:
+                self.qdrant_client.delete(collection_name=collection_name,
+                                          points_selector=PointIdsList(points=[int(pid) for pid in ids]))
+                logger.info(f"Deleted {len(ids)} emptied problems from {collection_name}")
+            except Exception as e:
+                logger.error(f"Failed to delete points from {collection_name}: {e}")
+
+    def publish_vocab_snapshot(self, snapshot):
+        # Only called once the points, alias swap and local index it describes
+        # are in place: a query worker starting mid-rebuild must keep loading
+        # the old term ids and dimension, which still match what it queries.
+        if self.vocab_snapshot_path:
+            with open(self.vocab_snapshot_path, "wb") as f:
+                f.write(snapshot)
+            logger.info(f"Wrote {len(snapshot)} byte vocab snapshot to {self.vocab_snapshot_path}")
+        if self.redis_client is not None:
+            # Query workers load the vocabulary from here; indexing on past a
+            # failed upload would leave them vectorizing against the old one.
+            self.redis_client.set(VOCAB_SNAPSHOT_KEY, snapshot)
+            logger.info(f"Uploaded {len(snapshot)} byte vocab snapshot to Redis")
+
+    def notify_reindex(self):
+        if self.redis_client is None:
+            logger.warning("No Redis client configured; query caches will expire by TTL only")
+            return
+        # Not swallowed: without the bump, query workers keep serving cached
+        # results and the old vocabulary until their TTLs run out.
+        version = self.redis_client.incr(INDEX_VERSION_KEY)
+        receivers = self.redis_client.publish(CACHE_INVALIDATE_CHANNEL, str(version))
+        logger.info(f"Bumped index version to {version} and notified {receivers} query workers")
 
 
 def create_qdrant_client():
@@ -161,10 +872,51 @@ def create_qdrant_client():
     )
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compute TF-IDF vectors and upsert them to Qdrant")
+    parser.add_argument("--vector-mode", choices=VECTOR_MODES, default="dense",
+                        help="write dense vectors to problems_v2, sparse vectors to problems_sparse, or both")
+    parser.add_argument("--local-index", metavar="PATH",
+                        help="also save the normalized doc-term matrix for query.py's local backend")
+    parser.add_argument("--vocab-snapshot", metavar="PATH",
+                        help="write the binary vocab/IDF snapshot to this file (it is uploaded to Redis either way)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for the vectorization pass (default: 1, in-process)")
+    parser.add_argument("--upsert-concurrency", type=int, default=4,
+                        help="Qdrant upsert batches kept in flight at once (default: 4)")
+    parser.add_argument("--min-df", type=int, default=1,
+                        help="drop terms found in fewer documents than this (default: 1, keep all)")
+    parser.add_argument("--max-df", type=float, default=1.0,
+                        help="drop terms found in more than this fraction of documents (default: 1.0)")
+    parser.add_argument("--max-vocab", type=int, default=0,
+                        help="keep only the N terms with the highest document frequency (default: no limit)")
+    parser.add_argument("--lsa-dim", type=int, default=0,
+                        help="also fit an N-dim LSA embedding (128-512) and write it to problems_lsa (default: off)")
+    parser.add_argument("--lsa-projection", metavar="PATH", default=LSA_PROJECTION_PATH,
+                        help="where to save the LSA projection matrix that query.py loads")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-vectorize problems changed since the last run (falls back to a full rebuild "
+                             "when no state has been saved yet)")
+    parser.add_argument("--force", action="store_true",
+                        help="full rebuild: upsert every point, not just those whose text or weights changed")
+    parser.add_argument("--idf-tolerance", type=float, default=IDF_TOLERANCE,
+                        help="relative IDF change that forces unchanged docs using a term to be re-vectorized "
+                             f"(default: {IDF_TOLERANCE})")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     qdrant_client = create_qdrant_client()
-    processor = TfIdfProcessor(qdrant_client=qdrant_client, collection_name="problems")
-    processor.process_and_upsert()
+    processor = TfIdfProcessor(qdrant_client=qdrant_client, vector_mode=args.vector_mode,
+                               local_index_path=args.local_index, redis_client=create_redis_client(),
+                               vocab_snapshot_path=args.vocab_snapshot, workers=args.workers,
+                               upsert_concurrency=args.upsert_concurrency, min_df=args.min_df, max_df=args.max_df,
+                               max_vocab=args.max_vocab, lsa_dim=args.lsa_dim, lsa_projection_path=args.lsa_projection)
+    if args.incremental:
+        processor.process_incremental(args.idf_tolerance)
+    else:
+        processor.process_and_upsert(force=args.force)
 
 
 if __name__ == "__main__":